@@ -3,29 +3,35 @@
 
 该文件负责：
 - 初始化日志记录。
-- 实例化数据源（例如 BaostockDataSource）。
+- 创建数据源代理（首次工具调用时才实例化 BaostockDataSource）。
 - 创建 FastMCP 应用实例。
-- 从 src.tools 中的各个模块注册所有可用的 MCP 工具。
+- 注册核心工具，其余工具模块通过 discover_tools 按需加载。
 - 通过 stdio 运行服务器。
 """
+import atexit
+import contextlib
+import functools
+import importlib
+import inspect
 import logging
-from datetime import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Final, Optional
 
-from mcp.server.fastmcp import FastMCP
+import anyio
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.types import TextContent, Tool as MCPTool
 
 # 导入接口和具体实现
 from src.data_source_interface import FinancialDataSource
-from src.baostock_data_source import BaostockDataSource
+from src.lazy_data_source import LazyDataSource
+from src.result_store import PREVIEW_CHARS, RESULT_URI_TEMPLATE, ResultStore, build_preview
 from src.utils import setup_logging
 
-# 导入各模块工具的注册函数
-from src.tools.stock_market import register_stock_market_tools
-from src.tools.financial_reports import register_financial_report_tools
-from src.tools.indices import register_index_tools
-from src.tools.market_overview import register_market_overview_tools
-from src.tools.macroeconomic import register_macroeconomic_tools
+# 导入核心工具的注册函数（启动时即注册）
 from src.tools.date_utils import register_date_utils_tools
-from src.tools.analysis import register_analysis_tools
 from src.tools.helpers import register_helpers_tools
 
 # --- 日志设置 ---
@@ -33,36 +39,303 @@ setup_logging(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # --- 依赖注入 ---
-active_data_source: FinancialDataSource = BaostockDataSource()
+# 缓存结果（已收盘区间 K 线、指数成分股、行业分类等）的 Parquet 磁盘缓存目录，未设置时不启用
+DISK_CACHE_DIR = os.environ.get("A_SHARE_MCP_DISK_CACHE_DIR", "")
 
-# --- 获取当前日期用于系统提示 ---
-current_date = datetime.now().strftime("%Y-%m-%d")
 
-# --- FastMCP 应用初始化 ---
-app = FastMCP(
-    server_name="a_share_data_provider",
-    description=f"""今天是{current_date}。提供中国A股市场数据分析工具。此服务提供客观数据分析，用户需自行做出投资决策。数据分析基于公开市场信息，不构成投资建议，仅供参考。
+def _create_data_source() -> FinancialDataSource:
+    """
+    构造真实数据源：Baostock 外包一层缓存。
+
+    baostock 与 pandas 的导入约占启动时间的一半，因此连同导入一起推迟到首次工具调用。
+    """
+    from src.baostock_data_source import BaostockDataSource
+    from src.caching_data_source import CachingDataSource, KLineRangeStore, ParquetDiskCache
+    disk_cache = kline_store = None
+    if DISK_CACHE_DIR:
+        try:
+            import pyarrow  # noqa: F401
+            disk_cache = ParquetDiskCache(DISK_CACHE_DIR)
+            kline_store = KLineRangeStore(os.path.join(DISK_CACHE_DIR, "kline"))
+            logger.info("已启用磁盘缓存: %s", DISK_CACHE_DIR)
+        except ImportError:
+            logger.warning("磁盘缓存需要 pyarrow (pip install a-share-mcp[arrow])，本次不启用。")
+    source = BaostockDataSource()
+    # 会话在工具调用间保持登录，进程退出时登出一次
+    atexit.register(source.logout)
+    return CachingDataSource(source, disk_cache=disk_cache, kline_store=kline_store)
+
+
+# 数据源延迟到首次工具调用时才构造，交易日历/指数/宏观等慢变数据走缓存
+active_data_source: FinancialDataSource = LazyDataSource(_create_data_source)
+
+# --- 系统提示模板（仅日期部分在运行时替换） ---
+_DESC_TEMPLATE: Final[str] = """今天是%s。提供中国A股市场数据分析工具。此服务提供客观数据分析，用户需自行做出投资决策。数据分析基于公开市场信息，不构成投资建议，仅供参考。
 
 ⚠️ 重要说明:
 1. 最新交易日不一定是今天，需要从 get_latest_trading_date() 获取
 2. 请始终使用 get_latest_trading_date() 工具获取实际当前最近的交易日，不要依赖训练数据中的日期认知
 3. 当分析"最近"或"近期"市场情况时，必须首先调用 get_market_analysis_timeframe() 工具确定实际的分析时间范围
 4. 任何涉及日期的分析必须基于工具返回的实际数据，不得使用过时或假设的日期
-""",
-)
-
-# --- 注册各模块的工具 ---
-register_stock_market_tools(app, active_data_source)
-register_financial_report_tools(app, active_data_source)
-register_index_tools(app, active_data_source)
-register_market_overview_tools(app, active_data_source)
-register_macroeconomic_tools(app, active_data_source)
+5. 行情、财报、指数、宏观等工具需先调用 discover_tools(category) 加载后才可使用
+"""
+
+
+@functools.cache
+def _build_description(date_str: str) -> str:
+    """用给定日期填充系统提示模板，同一日期只构建一次。"""
+    return _DESC_TEMPLATE % date_str
+
+
+# --- 当前日期（跨过本地午夜后才重新计算） ---
+_date_cache: tuple[float, str] = (0.0, "")
+
+
+def _cached_date() -> str:
+    """
+    返回本地日期字符串 YYYY-MM-DD。
+
+    结果缓存到下一个本地午夜，常态下只需一次时间戳比较；
+    长时间运行的服务器因此不会在系统提示中继续给出昨天的日期。
+    """
+    global _date_cache
+    expires_at, value = _date_cache
+    now = time.time()
+    if now >= expires_at:
+        today = datetime.fromtimestamp(now)
+        value = today.strftime("%Y-%m-%d")
+        midnight = datetime.combine(today.date() + timedelta(days=1), datetime.min.time())
+        _date_cache = (midnight.timestamp(), value)
+    return value
+
+# --- 按需加载的工具模块: 类别 -> (模块路径, 注册函数名) ---
+LAZY_MODULES = {
+    "stock_market": ("src.tools.stock_market", "register_stock_market_tools"),
+    "financial_reports": ("src.tools.financial_reports", "register_financial_report_tools"),
+    "indices": ("src.tools.indices", "register_index_tools"),
+    "market_overview": ("src.tools.market_overview", "register_market_overview_tools"),
+    "macroeconomic": ("src.tools.macroeconomic", "register_macroeconomic_tools"),
+    "analysis": ("src.tools.analysis", "register_analysis_tools"),
+}
+
+# 已加载的类别
+_loaded_categories: set[str] = set()
+
+# --- 大体积输出改为资源引用 ---
+# 超过该字符数的工具输出保存为 ashare://results/{key} 资源，响应中只返回预览和 URI。
+# 需要客户端支持 resources/read，因此默认关闭（0）；推荐值为 4096。
+RESOURCE_THRESHOLD = int(os.environ.get("A_SHARE_MCP_RESOURCE_THRESHOLD", "0") or 0)
+result_store = ResultStore()
+
+
+# 同步工具在工作线程中执行的最大并发数；Baostock 查询本身仍由会话锁串行化
+TOOL_WORKER_THREADS = 4
+_tool_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _run_in_worker_thread(fn):
+    """
+    把同步工具函数包装为在工作线程中执行的协程函数。
+
+    mcp 的 lowlevel Server 已为每个请求启动独立任务，但同步工具会直接阻塞事件循环，
+    使并发请求（包括 ping、取消通知和缓存命中的查询）退化为串行。
+    functools.wraps 保留 __wrapped__，FastMCP 仍按原函数签名生成参数模型。
+    """
+    @functools.wraps(fn)
+    async def wrapper(**kwargs):
+        global _tool_limiter
+        if _tool_limiter is None:
+            # CapacityLimiter 需在事件循环内创建
+            _tool_limiter = anyio.CapacityLimiter(TOOL_WORKER_THREADS)
+        return await anyio.to_thread.run_sync(functools.partial(fn, **kwargs), limiter=_tool_limiter)
+
+    return wrapper
+
+
+class CachedToolListFastMCP(FastMCP):
+    """
+    缓存 tools/list 响应、并按日刷新系统提示的 FastMCP。
+
+    工具列表只会在注册新工具时变化，因此在 add_tool 时使缓存失效，
+    其余 tools/list 请求直接复用上次构建的结果。
+    同步工具在注册时被包装为工作线程中执行，并发请求不会相互阻塞事件循环。
+
+    系统提示通过 description 属性提供，日期跨天后自动更新；这是系统提示中
+    "不要依赖训练数据中的日期认知" 提醒的根本修正，服务器自身不会给出过时日期。
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._tool_list_cache: Optional[list[MCPTool]] = None
+        self._batch_depth = 0
+        super().__init__(*args, **kwargs)
+        # 每次客户端初始化前同步最新的系统提示（SSE 下每个连接都会初始化一次）
+        server = self._mcp_server
+        create_options = server.create_initialization_options
+
+        def create_initialization_options(*args, **kwargs):
+            server.instructions = self.description
+            return create_options(*args, **kwargs)
+
+        server.create_initialization_options = create_initialization_options
+
+    @property
+    def description(self) -> str:
+        """当天的系统提示。"""
+        return _build_description(_cached_date())
+
+    @property
+    def instructions(self) -> str:
+        return self.description
+
+    def add_tool(self, fn, name: Optional[str] = None, description: Optional[str] = None) -> None:
+        if not inspect.iscoroutinefunction(fn):
+            fn = _run_in_worker_thread(fn)
+        super().add_tool(fn, name=name, description=description)
+        if not self._batch_depth:
+            self._tool_list_cache = None
+
+    @contextlib.contextmanager
+    def batch_tool_registration(self):
+        """
+        批量注册工具：上下文内的 add_tool 不逐个使缓存失效，退出时统一失效一次。
+
+        可嵌套使用，仅最外层退出时生效。
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._tool_list_cache = None
+
+    async def list_tools(self) -> list[MCPTool]:
+        if self._tool_list_cache is None:
+            self._tool_list_cache = await super().list_tools()
+        return list(self._tool_list_cache)
+
+    async def call_tool(self, name: str, arguments: dict):
+        content = await super().call_tool(name, arguments)
+        if RESOURCE_THRESHOLD <= 0:
+            return content
+        # 超过阈值的文本输出转存为资源，避免整张表格经 stdio 内联返回
+        converted = []
+        for item in content:
+            if isinstance(item, TextContent) and len(item.text) > RESOURCE_THRESHOLD:
+                uri = RESULT_URI_TEMPLATE.format(key=result_store.put(item.text))
+                logger.info("工具 '%s' 输出 %d 字符，已转存为资源 %s", name, len(item.text), uri)
+                item = TextContent(type="text", text=build_preview(
+                    item.text, uri, min(PREVIEW_CHARS, RESOURCE_THRESHOLD)))
+            converted.append(item)
+        return converted
+
+
+# --- FastMCP 应用初始化 ---
+app = CachedToolListFastMCP(server_name="a_share_data_provider")
+
+
+def load_tool_category(category: str) -> bool:
+    """
+    导入并注册指定类别的工具模块。
+
+    Args:
+        category (str): LAZY_MODULES 中的类别名。
+
+    Returns:
+        bool: 本次调用是否新注册了工具（已加载过则返回 False）。
+
+    Raises:
+        KeyError: 如果类别未知。
+    """
+    module_path, func_name = LAZY_MODULES[category]
+    if category in _loaded_categories:
+        return False
+    register = getattr(importlib.import_module(module_path), func_name)
+    with app.batch_tool_registration():
+        register(app, active_data_source)
+    _loaded_categories.add(category)
+    logger.info("已按需加载工具类别: %s", category)
+    return True
+
+
+def load_tool_categories(categories: list[str]) -> list[str]:
+    """
+    加载多个工具类别，返回本次新加载的类别。
+
+    尚未导入的模块先在线程池中并发导入以重叠导入 I/O；
+    注册仍在当前线程依次执行，因此 FastMCP 的工具表不会被并发修改，
+    且整批注册只使 tools/list 缓存失效一次。
+
+    Args:
+        categories (list[str]): LAZY_MODULES 中的类别名列表。
+
+    Returns:
+        list[str]: 本次新注册了工具的类别。
+    """
+    pending = [c for c in categories if c not in _loaded_categories]
+    if len(pending) > 1:
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            list(executor.map(importlib.import_module, [LAZY_MODULES[c][0] for c in pending]))
+    with app.batch_tool_registration():
+        return [c for c in pending if load_tool_category(c)]
+
+
+# --- 注册核心工具 ---
 register_date_utils_tools(app, active_data_source)
-register_analysis_tools(app, active_data_source)
 register_helpers_tools(app)
+# 注册函数只在启动时调用一次，之后不再保留引用
+del register_date_utils_tools, register_helpers_tools
+
+
+@app.resource(RESULT_URI_TEMPLATE, mime_type="text/plain")
+def read_stored_result(key: str) -> str:
+    """读取因体积过大而转存的工具输出。"""
+    text = result_store.get(key)
+    if text is None:
+        raise ValueError(f"资源 {key} 不存在或已过期，请重新调用对应工具。")
+    return text
+
+
+@app.tool()
+async def discover_tools(category: str, ctx: Context) -> str:
+    """
+    按类别加载更多工具。加载后客户端会收到工具列表变更通知并重新获取工具。
+
+    Args:
+        category (str): 'stock_market' (K线/基本信息/分红/复权), 'financial_reports' (季度财报/业绩快报/预告),
+                        'indices' (指数成分股/行业), 'market_overview' (交易日历/股票列表/停牌),
+                        'macroeconomic' (利率/准备金率/货币供应量), 'analysis' (分析报告), 'all' 之一。
+
+    Returns:
+        str: 加载结果说明。
+    """
+    logger.info("工具 'discover_tools' 已调用 category=%s", category)
+    key = (category or "").strip().lower()
+    if key != "all" and key not in LAZY_MODULES:
+        return f"错误: 无效的类别 '{category}'。有效选项为: {', '.join(LAZY_MODULES)}, all"
+
+    keys = list(LAZY_MODULES) if key == "all" else [key]
+    newly_loaded = load_tool_categories(keys)
+    if not newly_loaded:
+        return f"类别 {', '.join(keys)} 已加载，无需重复加载。"
+
+    try:
+        await ctx.session.send_tool_list_changed()
+    except Exception as e:
+        logger.warning("发送工具列表变更通知失败: %s", e)
+    return f"已加载类别: {', '.join(newly_loaded)}。请重新获取工具列表。"
+
 
 # --- 主执行块 ---
+# 可选传输方式由 FastMCP 提供；默认且推荐使用 stdio JSON-RPC
+SUPPORTED_TRANSPORTS = ("stdio", "sse")
+
 if __name__ == "__main__":
+    transport = os.environ.get("A_SHARE_MCP_TRANSPORT", "stdio").strip().lower()
+    if transport not in SUPPORTED_TRANSPORTS:
+        logger.warning(
+            "不支持的传输方式 '%s'，回退到 stdio。可选值: %s", transport, ", ".join(SUPPORTED_TRANSPORTS))
+        transport = "stdio"
     logger.info(
-        f"通过 stdio 启动 A 股 MCP 服务器... 今天是 {current_date}")
-    app.run(transport='stdio')
+        "通过 %s 启动 A 股 MCP 服务器... 今天是 %s", transport, _cached_date())
+    app.run(transport=transport)
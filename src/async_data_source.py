@@ -0,0 +1,95 @@
+# FinancialDataSource 的 asyncio 适配层，把阻塞的 get_* 方法放到工作线程执行
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from .data_source_interface import FinancialDataSource
+
+logger = logging.getLogger(__name__)
+
+# 默认工作线程数。Baostock 查询在进程级会话锁上串行执行，更多线程只会排队；
+# 线程数主要决定缓存命中等不访问 Baostock 的调用能并发多少。
+DEFAULT_MAX_WORKERS = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _default_executor() -> ThreadPoolExecutor:
+    """返回进程共享的线程池，首次使用时创建。"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="a_share_data")
+        return _executor
+
+
+class AsyncDataSource:
+    """
+    为数据源的每个 get_X 方法提供对应的协程 aget_X。
+
+    用法: df = await AsyncDataSource(source).aget_historical_k_data(...)；
+    多次调用可用 agather 并发执行。
+    调用在线程池中执行，不阻塞事件循环；线程安全由底层数据源保证
+    （BaostockDataSource 通过进程级会话锁串行访问共享 socket）。
+    其余属性原样转发给被包装的数据源。
+    """
+
+    def __init__(self, source: FinancialDataSource, executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Args:
+            source (FinancialDataSource): 被包装的数据源。
+            executor (Optional[ThreadPoolExecutor], optional): 执行阻塞调用的线程池。默认使用进程共享的线程池。
+        """
+        self._source = source
+        self._executor = executor
+
+    async def agather(
+        self,
+        name: str,
+        calls: Iterable[Dict[str, Any]],
+        limit: int = DEFAULT_MAX_WORKERS,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        并发执行同一个 get_X 方法的多次调用，结果顺序与 calls 一致。
+
+        用 asyncio.gather 加信号量代替进程池扇出：同时在途的调用不超过 limit 个，
+        不需要额外的进程和参数序列化。
+
+        Args:
+            name (str): 数据源方法名 (例如, 'get_profit_data')。
+            calls (Iterable[Dict[str, Any]]): 每次调用的关键字参数。
+            limit (int, optional): 同时执行的最大调用数。默认为 DEFAULT_MAX_WORKERS。
+            return_exceptions (bool, optional): 为 True 时把异常作为结果返回，而不是在第一个异常处抛出。默认为 False。
+
+        Returns:
+            List[Any]: 各次调用的返回值（或异常）。
+        """
+        method = getattr(self, f"a{name}")
+        semaphore = asyncio.Semaphore(limit)
+
+        async def bounded(kwargs: Dict[str, Any]):
+            async with semaphore:
+                return await method(**kwargs)
+
+        return await asyncio.gather(
+            *(bounded(kwargs) for kwargs in calls), return_exceptions=return_exceptions)
+
+    def __getattr__(self, name: str):
+        if not name.startswith("aget_"):
+            return getattr(self._source, name)
+        method = getattr(self._source, name[1:])
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor or _default_executor(), functools.partial(method, *args, **kwargs))
+
+        call.__name__ = name
+        return call
@@ -1,10 +1,11 @@
 # 使用 Baostock 实现 FinancialDataSource 接口
 import baostock as bs
 import pandas as pd
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Union
 import logging
 from .data_source_interface import FinancialDataSource, DataSourceError, NoDataFoundError, LoginError
-from .utils import baostock_login_context
+from .utils import baostock_login_context, baostock_logout, query_with_relogin
 
 # 获取此模块的 logger 实例
 logger = logging.getLogger(__name__)
@@ -20,211 +21,451 @@ DEFAULT_BASIC_FIELDS = [
     # 可根据需要添加更多默认字段, 例如 "industry", "listingDate"
 ]
 
-# 辅助函数，用于减少财务数据获取中的重复代码
-def _fetch_financial_data(
-    bs_query_func,
-    data_type_name: str,
-    code: str,
-    year: str,
-    quarter: int
-) -> pd.DataFrame:
+# 默认字段列表是常量，预先拼接好 Baostock 需要的逗号分隔字符串
+_DEFAULT_K_FIELDS_STR = ",".join(DEFAULT_K_FIELDS)
+_DEFAULT_BASIC_FIELDS_STR = ",".join(DEFAULT_BASIC_FIELDS)
+
+# K 线数值列的目标类型；日期、代码及 adjustflag/tradestatus/isST 等标志列保持字符串，
+# 以免影响按 '1'/'0' 比较的下游代码。价格用 float64 而非 float32，避免输出出现 10.529999 这类尾数。
+K_FIELD_DTYPES = {
+    "open": "float64", "high": "float64", "low": "float64", "close": "float64",
+    "preclose": "float64", "volume": "int64", "amount": "float64", "turn": "float64",
+    "pctChg": "float64", "peTTM": "float64", "pbMRQ": "float64", "psTTM": "float64",
+    "pcfNcfTTM": "float64",
+}
+
+# 表示"无记录"的 Baostock 错误码。Baostock 的错误码表 (baostock.common.contants) 没有
+# 专门的无记录码，服务端以错误信息 "no record found" 报告，因此错误码未命中时再按信息匹配。
+_NO_DATA_CODES = frozenset({"10002"})
+_NO_DATA_MESSAGE = "no record found"
+
+# 复权因子数值列的目标类型
+ADJUST_FACTOR_DTYPES = {
+    "foreAdjustFactor": "float64", "backAdjustFactor": "float64", "adjustFactor": "float64",
+}
+
+
+def _apply_dtypes(df: pd.DataFrame, dtypes: Optional[Dict[str, str]]) -> pd.DataFrame:
+    """
+    按 schema 把字符串列一次性转换为数值类型，不在 schema 中的列保持原样。
+
+    空字符串等无法解析的值变为缺失值（浮点列为 NaN）；整数列含缺失值时使用可空的 Int64，
+    整数不会被输出为 1000.0 这样的浮点数。
+    """
+    if not dtypes or df.empty:
+        return df
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        if dtype.startswith("int") and values.isna().any():
+            dtype = "Int64"
+        df[col] = values.astype(dtype)
+    return df
+
+
+def _take_page(rs) -> list:
+    """
+    取出结果集当前页中尚未读取的全部行，并把游标移到页尾。
+
+    rs.data 保存当前页（至多 2000 行）已解析好的行列表；整页切片代替逐行调用
+    rs.next()/rs.get_row_data()，省去每行两次方法调用。下一次 rs.next() 会照常翻页。
+    当前页尚未读取过时直接返回 rs.data 本身，不做复制；翻页时 rs.next() 会把
+    rs.data 替换为新列表而不是修改原列表，因此调用方持有的引用保持不变。
+    """
+    page = rs.data if rs.cur_row_num == 0 else rs.data[rs.cur_row_num:]
+    rs.cur_row_num = len(rs.data)
+    return page
+
+
+def _drain_rs_rows(rs) -> list:
+    """
+    读取 Baostock 结果集的全部行，返回行列表。
+
+    rs.next() 会按页从服务器拉取后续数据，因此必须在登录会话内调用。
+    """
+    rows: Optional[list] = None
+    while rs.next():
+        page = _take_page(rs)
+        if rows is None:
+            # 单页结果（最常见）直接使用 Baostock 已解析的行列表，零复制
+            rows = page
+        else:
+            # 此时 rs.data 已是新一页的列表，扩展首页列表不会影响结果集
+            rows.extend(page)
+    return rows or []
+
+
+def _import_pyarrow():
+    """按需导入可选依赖 pyarrow，未安装时给出安装提示。"""
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "返回 Arrow 表需要 pyarrow，请通过 `pip install a-share-mcp[arrow]` 安装。") from e
+    return pyarrow
+
+
+def _rows_to_arrow(rows: list, fields: List[str], dtypes: Optional[Dict[str, str]] = None):
     """
-    通用函数，用于从 Baostock 获取季度的财务数据。
+    把 Baostock 行列表按列构造为 pyarrow.Table，不经过 pandas。
+
+    每列先以字符串数组构造（空字符串视为缺失值），再由 pyarrow 在 C 层转换为
+    dtypes 指定的数值类型；不在 dtypes 中的列保持字符串。
 
     Args:
-        bs_query_func (function): 用于查询的 Baostock 函数 (例如, bs.query_profit_data)。
-        data_type_name (str): 数据类型的名称，用于日志记录 (例如, "Profitability")。
-        code (str): 股票代码。
-        year (str): 年份。
-        quarter (int): 季度。
+        rows (list): _drain_rs_rows 返回的行列表。
+        fields (List[str]): 列名。
+        dtypes (Optional[Dict[str, str]], optional): 列名到目标类型的映射 (例如, K_FIELD_DTYPES)。
 
     Returns:
-        pd.DataFrame: 包含财务数据的 pandas DataFrame。
+        pyarrow.Table: 带显式 schema 的表。
 
     Raises:
-        LoginError: 如果 Baostock 登录失败。
-        NoDataFoundError: 如果未找到数据。
-        DataSourceError: 如果发生其他 Baostock API 错误。
+        ImportError: 如果未安装 pyarrow。
     """
-    logger.info(
-        f"正在获取 {data_type_name} 数据，代码: {code}，年份: {year}，季度: {quarter}")
-    try:
+    pa = _import_pyarrow()
+    dtypes = dtypes or {}
+    columns = list(zip(*rows)) if rows else [()] * len(fields)
+    arrays = []
+    schema = []
+    for name, values in zip(fields, columns):
+        array = pa.array([v if v != "" else None for v in values], type=pa.string())
+        target = pa.type_for_alias(dtypes[name]) if name in dtypes else pa.string()
+        if target != pa.string():
+            array = array.cast(target)
+        arrays.append(array)
+        schema.append(pa.field(name, target))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(schema))
+
+
+def _iter_rs_pages(rs) -> Iterator[list]:
+    """
+    逐页读取 Baostock 结果集，产出每页尚未读取的行。
+
+    Baostock 的翻页是携带页码的独立请求，每次翻页单独进入 baostock_login_context，
+    产出时不持有会话: 暂停的迭代器不会占住会话锁，也不会在创建它的线程上
+    留下嵌套层数，可以在任意线程上继续迭代。
+    """
+    while True:
         with baostock_login_context():
-            rs = bs_query_func(code=code, year=year, quarter=quarter)
-
-            if rs.error_code != '0':
-                logger.error(
-                    f"Baostock API 错误 ({data_type_name})，代码 {code}: {rs.error_msg} (错误码: {rs.error_code})")
-                if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                    raise NoDataFoundError(
-                        f"未找到 {code} 在 {year}年Q{quarter} 的 {data_type_name} 数据。Baostock 消息: {rs.error_msg}")
-                else:
-                    raise DataSourceError(
-                        f"获取 {data_type_name} 数据时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-            data_list = []
-            while rs.next():
-                data_list.append(rs.get_row_data())
-
-            if not data_list:
-                logger.warning(
-                    f"未找到 {code} 在 {year}年Q{quarter} 的 {data_type_name} 数据 (Baostock 返回空结果集)。")
-                raise NoDataFoundError(
-                    f"未找到 {code} 在 {year}年Q{quarter} 的 {data_type_name} 数据 (空结果集)。")
+            if not rs.next():
+                return
+            page = _take_page(rs)
+        yield page
+
 
-            result_df = pd.DataFrame(data_list, columns=rs.fields)
-            logger.info(
-                f"已获取 {len(result_df)} 条关于 {code} 在 {year}年Q{quarter} 的 {data_type_name} 记录。")
-            return result_df
+def _iter_rs_chunks(rs, chunksize: int, dtypes: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    按块读取 Baostock 结果集，每次产出至多 chunksize 行的 DataFrame。
+
+    翻页见 _iter_rs_pages，调用方不需要（也不应该）在会话上下文内迭代。
+
+    Args:
+        rs: Baostock 查询返回的 ResultData。
+        chunksize (int): 每块的最大行数。
+        dtypes (Optional[Dict[str, str]], optional): 列名到目标类型的映射，见 _apply_dtypes。
+
+    Yields:
+        pd.DataFrame: 列名为 rs.fields 的分块 DataFrame。
+    """
+    rows = []
+    for page in _iter_rs_pages(rs):
+        rows.extend(page)
+        while len(rows) >= chunksize:
+            yield _apply_dtypes(pd.DataFrame(rows[:chunksize], columns=rs.fields), dtypes)
+            del rows[:chunksize]
+    if rows:
+        yield _apply_dtypes(pd.DataFrame(rows, columns=rs.fields), dtypes)
 
+
+# --- 通用查询流程 ---
+# 所有接口共用同一套流程: 登录 → 查询 → 检查错误码 → 读取结果集 → 空结果检查 → 异常转换。
+
+@contextmanager
+def _translate_errors(data_type_name: str, subject: str):
+    """
+    统一的异常处理: 已知错误记录后原样抛出，其余异常包装为 DataSourceError。
+
+    Args:
+        data_type_name (str): 数据类型的名称，用于日志记录 (例如, "K线")。
+        subject (str): 查询对象的描述，用于日志和错误消息 (例如, "sh.600000 (2024-01-01 到 2024-01-31)")。
+    """
+    try:
+        yield
     except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
         logger.warning(
-            f"获取 {data_type_name} 数据时捕获到已知错误，代码 {code}: {type(e).__name__}")
+            "获取 %s 数据时捕获到已知错误，%s: %s", data_type_name, subject, type(e).__name__)
         raise e
     except Exception as e:
         logger.exception(
-            f"获取 {data_type_name} 数据时发生未知错误，代码 {code}: {e}")
+            "获取 %s 数据时发生未知错误，%s: %s", data_type_name, subject, e)
+        raise DataSourceError(
+            f"获取 {data_type_name} 数据时发生未知错误，{subject}: {e}")
+
+
+def _check_rs(rs, data_type_name: str, subject: str) -> None:
+    """
+    检查 Baostock 查询的错误码。
+
+    Raises:
+        NoDataFoundError: 如果 Baostock 报告无记录。
+        DataSourceError: 如果发生其他 Baostock API 错误。
+    """
+    if rs.error_code != '0':
+        logger.error(
+            "Baostock API 错误 (%s)，%s: %s (错误码: %s)", data_type_name, subject, rs.error_msg, rs.error_code)
+        if rs.error_code in _NO_DATA_CODES or _NO_DATA_MESSAGE in rs.error_msg.lower():
+            raise NoDataFoundError(
+                f"未找到 {subject} 的 {data_type_name} 数据。Baostock 消息: {rs.error_msg}")
         raise DataSourceError(
-            f"获取 {data_type_name} 数据时发生未知错误，代码 {code}: {e}")
+            f"获取 {data_type_name} 数据时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
 
-# 辅助函数，用于减少指数成分股数据获取的重复代码
-def _fetch_index_constituent_data(
+
+def _query_data(
     bs_query_func,
-    index_name: str,
-    date: Optional[str] = None
+    data_type_name: str,
+    subject: str,
+    *args,
+    dtypes: Optional[Dict[str, str]] = None,
+    keep_columns: Optional[List[str]] = None,
+    **kwargs
 ) -> pd.DataFrame:
     """
-    通用函数，用于从 Baostock 获取指数成分股数据。
+    在已登录的会话中执行一次查询并读取全部结果，调用方负责登录和异常转换。
 
     Args:
-        bs_query_func (function): 用于查询的 Baostock 函数 (例如, bs.query_sz50_stocks)。
-        index_name (str): 指数名称，用于日志记录 (例如, "SZSE 50")。
-        date (Optional[str], optional): 查询日期，格式 'YYYY-MM-DD'。默认为最新日期。
+        bs_query_func (function): Baostock 查询函数 (例如, bs.query_profit_data)。
+        data_type_name (str): 数据类型的名称，用于日志记录。
+        subject (str): 查询对象的描述，用于日志和错误消息。
+        *args, **kwargs: 传递给查询函数的参数。
+        dtypes (Optional[Dict[str, str]], optional): 列名到目标类型的映射，见 _apply_dtypes。
+        keep_columns (Optional[List[str]], optional): 只保留这些列（按给定顺序，忽略结果中不存在的列）。
+            在构造 DataFrame 之前按行投影，不会先建出完整的表再复制。默认保留全部列。
 
     Returns:
-        pd.DataFrame: 包含指数成分股数据的 pandas DataFrame。
-    """
-    logger.info(
-        f"正在获取 {index_name} 成分股，日期: {date or '最新'}")
-    try:
-        with baostock_login_context():
-            rs = bs_query_func(date=date)
-
-            if rs.error_code != '0':
-                logger.error(
-                    f"Baostock API 错误 ({index_name} 成分股)，日期 {date}: {rs.error_msg} (错误码: {rs.error_code})")
-                if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                    raise NoDataFoundError(
-                        f"未找到日期为 {date} 的 {index_name} 成分股数据。Baostock 消息: {rs.error_msg}")
-                else:
-                    raise DataSourceError(
-                        f"获取 {index_name} 成分股时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-            data_list = []
-            while rs.next():
-                data_list.append(rs.get_row_data())
-
-            if not data_list:
-                logger.warning(
-                    f"未找到日期为 {date} 的 {index_name} 成分股数据 (空结果集)。")
-                raise NoDataFoundError(
-                    f"未找到日期为 {date} 的 {index_name} 成分股数据 (空结果集)。")
+        pd.DataFrame: 查询结果。
 
-            result_df = pd.DataFrame(data_list, columns=rs.fields)
-            logger.info(
-                f"已获取 {len(result_df)} 条关于 {index_name} 的成分股记录，日期: {date or '最新'}")
-            return result_df
+    Raises:
+        ValueError: 如果 keep_columns 中的列在结果中均不存在。
+        NoDataFoundError: 如果未找到数据。
+        DataSourceError: 如果发生其他 Baostock API 错误。
+    """
+    rs = query_with_relogin(bs_query_func, *args, **kwargs)
+    _check_rs(rs, data_type_name, subject)
 
-    except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
+    rows = _drain_rs_rows(rs)
+    if not rows:
+        # 空结果直接抛出，不再构造空 DataFrame 和做类型转换
         logger.warning(
-            f"获取 {index_name} 成分股时捕获到已知错误，日期 {date}: {type(e).__name__}")
-        raise e
-    except Exception as e:
-        logger.exception(
-            f"获取 {index_name} 成分股时发生未知错误，日期 {date}: {e}")
-        raise DataSourceError(
-            f"获取 {index_name} 成分股时发生未知错误，日期 {date}: {e}")
+            "未找到 %s 的 %s 数据 (Baostock 返回空结果集)。", subject, data_type_name)
+        raise NoDataFoundError(
+            f"未找到 {subject} 的 {data_type_name} 数据 (空结果集)。")
+
+    columns = rs.fields
+    if keep_columns:
+        columns = [col for col in keep_columns if col in rs.fields]
+        if not columns:
+            raise ValueError(
+                f"请求的字段 {keep_columns} 在{data_type_name}结果中均不可用。")
+        positions = [rs.fields.index(col) for col in columns]
+        rows = [[row[i] for i in positions] for row in rows]
+
+    # Baostock 的值均为字符串，直接以行列表构造 DataFrame 是实测最快的方式
+    # （比先转置为按列的 dict 或预分配的 numpy 对象数组都快）
+    result_df = _apply_dtypes(pd.DataFrame(rows, columns=columns), dtypes)
+    # 成功路径每次查询都会执行，只在 DEBUG 级别记录
+    logger.debug("已获取 %d 条 %s 记录，%s。", len(result_df), data_type_name, subject)
+    return result_df
+
+
+def _fetch_data(
+    bs_query_func,
+    data_type_name: str,
+    subject: str,
+    *args,
+    dtypes: Optional[Dict[str, str]] = None,
+    keep_columns: Optional[List[str]] = None,
+    **kwargs
+) -> pd.DataFrame:
+    """
+    通用函数: 在 Baostock 会话中执行一次查询，返回 DataFrame。
 
-# 辅助函数，用于减少宏观经济数据获取的重复代码
-def _fetch_macro_data(
+    参数同 _query_data。
+
+    Raises:
+        ValueError: 如果 keep_columns 中的列在结果中均不存在。
+        LoginError: 如果 Baostock 登录失败。
+        NoDataFoundError: 如果未找到数据。
+        DataSourceError: 如果发生其他 Baostock API 错误。
+    """
+    logger.info("正在获取 %s 数据，%s", data_type_name, subject)
+    with _translate_errors(data_type_name, subject):
+        with baostock_login_context():
+            return _query_data(
+                bs_query_func, data_type_name, subject, *args,
+                dtypes=dtypes, keep_columns=keep_columns, **kwargs)
+
+
+def _fetch_financial_data(
     bs_query_func,
     data_type_name: str,
+    code: str,
+    year: str,
+    quarter: int
+) -> pd.DataFrame:
+    """从 Baostock 获取季度的财务数据。"""
+    return _fetch_data(
+        bs_query_func, data_type_name, f"代码 {code}，{year}年Q{quarter}",
+        code=code, year=year, quarter=quarter)
+
+
+# 季度财务数据代号 -> (Baostock 查询函数, 数据类型名称)
+FINANCIAL_QUERIES = {
+    "profit": (bs.query_profit_data, "盈利能力"),
+    "operation": (bs.query_operation_data, "运营能力"),
+    "growth": (bs.query_growth_data, "成长能力"),
+    "balance": (bs.query_balance_data, "资产负债"),
+    "cash_flow": (bs.query_cash_flow_data, "现金流量"),
+    "dupont": (bs.query_dupont_data, "杜邦指数"),
+}
+
+# 指数代号 -> (Baostock 查询函数, 指数名称)
+INDEX_QUERIES = {
+    "sz50": (bs.query_sz50_stocks, "上证50"),
+    "hs300": (bs.query_hs300_stocks, "沪深300"),
+    "zz500": (bs.query_zz500_stocks, "中证500"),
+}
+
+# 宏观数据代号 -> (Baostock 查询函数, 数据类型名称)
+MACRO_QUERIES = {
+    "deposit_rate": (bs.query_deposit_rate_data, "存款利率"),
+    "loan_rate": (bs.query_loan_rate_data, "贷款利率"),
+    "required_reserve_ratio": (bs.query_required_reserve_ratio_data, "存款准备金率"),
+    "money_supply_month": (bs.query_money_supply_data_month, "月度货币供应量"),
+    "money_supply_year": (bs.query_money_supply_data_year, "年度货币供应量"),
+}
+
+
+def _fetch_index_constituent_batch(
+    indexes: List[str],
+    date: Optional[str] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    在一次登录会话中获取多个指数的成分股。
+
+    Args:
+        indexes (List[str]): INDEX_QUERIES 中的指数代号列表 (例如, ['sz50', 'hs300'])。
+        date (Optional[str], optional): 查询日期，格式 'YYYY-MM-DD'。默认为最新日期。
+
+    Returns:
+        Dict[str, pd.DataFrame]: 指数代号到成分股 DataFrame 的映射，顺序与 indexes 一致。
+
+    Raises:
+        ValueError: 如果指数代号未知。
+        LoginError: 如果 Baostock 登录失败。
+        NoDataFoundError: 如果任一指数未找到数据。
+        DataSourceError: 如果发生其他 Baostock API 错误。
+    """
+    unknown = [i for i in indexes if i not in INDEX_QUERIES]
+    if unknown:
+        raise ValueError(
+            f"未知的指数代号: {unknown}。有效选项为: {list(INDEX_QUERIES)}")
+    subject = f"日期 {date or '最新'}"
+    data_type_name = f"{'、'.join(INDEX_QUERIES[i][1] for i in indexes)} 成分股"
+    logger.info("正在获取 %s，%s", data_type_name, subject)
+    with _translate_errors(data_type_name, subject):
+        with baostock_login_context():
+            return {
+                i: _query_data(INDEX_QUERIES[i][0], f"{INDEX_QUERIES[i][1]} 成分股", subject, date=date)
+                for i in indexes
+            }
+
+
+def _fetch_macro_batch(
+    kinds: List[str],
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    **kwargs
-) -> pd.DataFrame:
+    extra_kwargs: Optional[Dict[str, dict]] = None
+) -> Dict[str, pd.DataFrame]:
     """
-    通用函数，用于从 Baostock 获取宏观经济数据。
+    在一次登录会话中获取多种宏观经济数据。
 
     Args:
-        bs_query_func (function): 用于查询的 Baostock 函数。
-        data_type_name (str): 数据类型的名称，用于日志记录。
+        kinds (List[str]): MACRO_QUERIES 中的数据代号列表。
         start_date (Optional[str], optional): 开始日期。
         end_date (Optional[str], optional): 结束日期。
-        **kwargs: 传递给 Baostock 函数的其他参数 (例如, yearType)。
+        extra_kwargs (Optional[Dict[str, dict]], optional): 按数据代号传递给 Baostock 函数的其他参数
+            (例如, {'required_reserve_ratio': {'yearType': '0'}})。
 
     Returns:
-        pd.DataFrame: 包含宏观经济数据的 pandas DataFrame。
+        Dict[str, pd.DataFrame]: 数据代号到 DataFrame 的映射，顺序与 kinds 一致。
+
+    Raises:
+        ValueError: 如果数据代号未知。
+        LoginError: 如果 Baostock 登录失败。
+        NoDataFoundError: 如果任一数据未找到。
+        DataSourceError: 如果发生其他 Baostock API 错误。
     """
-    date_range_log = f"从 {start_date or '默认'} 到 {end_date or '默认'}"
-    kwargs_log = f", 额外参数={kwargs}" if kwargs else ""
-    logger.info(f"正在获取 {data_type_name} 数据 {date_range_log}{kwargs_log}")
-    try:
+    unknown = [k for k in kinds if k not in MACRO_QUERIES]
+    if unknown:
+        raise ValueError(
+            f"未知的宏观数据代号: {unknown}。有效选项为: {list(MACRO_QUERIES)}")
+    extra_kwargs = {k: v for k, v in (extra_kwargs or {}).items() if k in kinds}
+    data_type_name = "、".join(MACRO_QUERIES[k][1] for k in kinds)
+    subject = f"从 {start_date or '默认'} 到 {end_date or '默认'}"
+    logger.info("正在获取 %s 数据 %s%s", data_type_name, subject,
+                f", 额外参数={extra_kwargs}" if extra_kwargs else "")
+    with _translate_errors(data_type_name, subject):
         with baostock_login_context():
-            rs = bs_query_func(start_date=start_date,
-                               end_date=end_date, **kwargs)
-
-            if rs.error_code != '0':
-                logger.error(
-                    f"Baostock API 错误 ({data_type_name}): {rs.error_msg} (错误码: {rs.error_code})")
-                if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                    raise NoDataFoundError(
-                        f"未找到符合条件的 {data_type_name} 数据。Baostock 消息: {rs.error_msg}")
-                else:
-                    raise DataSourceError(
-                        f"获取 {data_type_name} 数据时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-            data_list = []
-            while rs.next():
-                data_list.append(rs.get_row_data())
-
-            if not data_list:
-                logger.warning(
-                    f"未找到符合条件的 {data_type_name} 数据 (空结果集)。")
-                raise NoDataFoundError(
-                    f"未找到符合条件的 {data_type_name} 数据 (空结果集)。")
-
-            result_df = pd.DataFrame(data_list, columns=rs.fields)
-            logger.info(
-                f"已获取 {len(result_df)} 条 {data_type_name} 记录。")
-            return result_df
-
-    except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
-        logger.warning(
-            f"获取 {data_type_name} 数据时捕获到已知错误: {type(e).__name__}")
-        raise e
-    except Exception as e:
-        logger.exception(
-            f"获取 {data_type_name} 数据时发生未知错误: {e}")
-        raise DataSourceError(
-            f"获取 {data_type_name} 数据时发生未知错误: {e}")
+            return {
+                k: _query_data(
+                    MACRO_QUERIES[k][0], MACRO_QUERIES[k][1], subject,
+                    start_date=start_date, end_date=end_date, **extra_kwargs.get(k, {}))
+                for k in kinds
+            }
 
 
 class BaostockDataSource(FinancialDataSource):
     """
     使用 Baostock 库实现 FinancialDataSource 的具体类。
+
+    登录会话在多次查询间复用（见 utils.baostock_login_context）。
+    也可作为上下文管理器使用：进入时预先登录，退出时登出。
     """
 
+    def ensure_login(self) -> None:
+        """登录 Baostock（会话已登录时直接返回）。"""
+        with baostock_login_context():
+            pass
+
+    def logout(self) -> None:
+        """登出 Baostock 的进程级会话。"""
+        baostock_logout()
+
+    def __enter__(self) -> "BaostockDataSource":
+        self.ensure_login()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.logout()
+
     def _format_fields(self, fields: Optional[List[str]], default_fields: List[str]) -> str:
         """将字段列表格式化为 Baostock 需要的逗号分隔字符串。"""
-        if fields is None or not fields:
-            logger.debug(
-                f"未请求特定字段，使用默认值: {default_fields}")
+        if not fields:
+            logger.debug("未请求特定字段，使用默认值: %s", default_fields)
+            if default_fields is DEFAULT_K_FIELDS:
+                return _DEFAULT_K_FIELDS_STR
+            if default_fields is DEFAULT_BASIC_FIELDS:
+                return _DEFAULT_BASIC_FIELDS_STR
             return ",".join(default_fields)
-        if not all(isinstance(f, str) for f in fields):
-            raise ValueError("字段列表中的所有项都必须是字符串。")
-        logger.debug(f"使用请求的字段: {fields}")
-        return ",".join(fields)
+        try:
+            # join 遇到非字符串项会抛出 TypeError，无需预先逐项检查类型
+            formatted = ",".join(fields)
+        except TypeError:
+            raise ValueError("字段列表中的所有项都必须是字符串。") from None
+        logger.debug("使用请求的字段: %s", fields)
+        return formatted
 
     def get_historical_k_data(
         self,
@@ -234,468 +475,343 @@ class BaostockDataSource(FinancialDataSource):
         frequency: str = "d",
         adjust_flag: str = "3",
         fields: Optional[List[str]] = None,
-    ) -> pd.DataFrame:
-        """使用 Baostock 获取历史K线数据。"""
-        logger.info(
-            f"正在为 {code} 获取K线数据 ({start_date} 到 {end_date})，频率={frequency}，复权={adjust_flag}")
-        try:
+        chunksize: Optional[int] = None,
+    ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+        """
+        使用 Baostock 获取历史K线数据。
+
+        指定 chunksize 时返回分块迭代器，用法: for chunk in ds.get_historical_k_data(..., chunksize=50_000): sink(chunk)。
+        分块之间不持有 Baostock 会话，迭代器可以在任意线程上继续迭代。
+        """
+        if chunksize is not None:
+            if chunksize <= 0:
+                raise ValueError("chunksize 必须为正整数。")
+            return self._iter_historical_k_data(
+                code, start_date, end_date, frequency, adjust_flag, fields, chunksize)
+
+        subject = f"{code} ({start_date} 到 {end_date})，频率={frequency}，复权={adjust_flag}"
+        logger.info("正在获取 K线 数据，%s", subject)
+        with _translate_errors("K线", subject):
+            formatted_fields = self._format_fields(fields, DEFAULT_K_FIELDS)
+            with baostock_login_context():
+                return _query_data(
+                    bs.query_history_k_data_plus, "K线", subject,
+                    code, formatted_fields, start_date=start_date, end_date=end_date,
+                    frequency=frequency, adjustflag=adjust_flag, dtypes=K_FIELD_DTYPES)
+
+    def _iter_historical_k_data(
+        self,
+        code: str,
+        start_date: str,
+        end_date: str,
+        frequency: str,
+        adjust_flag: str,
+        fields: Optional[List[str]],
+        chunksize: int,
+    ) -> Iterator[pd.DataFrame]:
+        """get_historical_k_data 的分块版本，按 chunksize 行产出 DataFrame。"""
+        subject = f"{code} ({start_date} 到 {end_date})，频率={frequency}，复权={adjust_flag}，块大小={chunksize}"
+        logger.info("正在分块获取 K线 数据，%s", subject)
+        with _translate_errors("K线", subject):
             formatted_fields = self._format_fields(fields, DEFAULT_K_FIELDS)
-            logger.debug(
-                f"向 Baostock 请求的字段: {formatted_fields}")
+            total = 0
+            with baostock_login_context():
+                rs = query_with_relogin(
+                    bs.query_history_k_data_plus, code, formatted_fields, start_date=start_date,
+                    end_date=end_date, frequency=frequency, adjustflag=adjust_flag)
+                _check_rs(rs, "K线", subject)
+            # 在会话上下文之外产出分块，翻页时再各自进入会话
+            for chunk in _iter_rs_chunks(rs, chunksize, K_FIELD_DTYPES):
+                total += len(chunk)
+                yield chunk
+
+            if total == 0:
+                logger.warning("未找到 %s 的 K线 数据 (Baostock 返回空结果集)。", subject)
+                raise NoDataFoundError(
+                    f"未找到 {subject} 的 K线 数据 (空结果集)。")
+            logger.debug("已分块获取 %d 条 K线 记录，%s。", total, subject)
+
+    def get_historical_k_data_arrow(
+        self,
+        code: str,
+        start_date: str,
+        end_date: str,
+        frequency: str = "d",
+        adjust_flag: str = "3",
+        fields: Optional[List[str]] = None,
+    ):
+        """
+        使用 Baostock 获取历史K线数据，直接返回 pyarrow.Table。
+
+        数值列按 K_FIELD_DTYPES 转换为 float64/int64，适合直接写入 Parquet/Arrow IPC
+        或交给其他列式工具，省去 pandas 对象列的中间表示。需要可选依赖 pyarrow。
+
+        Returns:
+            pyarrow.Table: K线数据，列顺序与请求的字段一致。
+
+        Raises:
+            ImportError: 如果未安装 pyarrow。
+            NoDataFoundError: 如果未找到数据。
+            DataSourceError: 如果发生其他 Baostock API 错误。
+        """
+        subject = f"{code} ({start_date} 到 {end_date})，频率={frequency}，复权={adjust_flag}"
+        # 在发起查询前检查可选依赖，缺失时直接抛出 ImportError 而不是包装为 DataSourceError
+        _import_pyarrow()
+        logger.info("正在获取 K线 数据 (Arrow)，%s", subject)
+        with _translate_errors("K线", subject):
+            formatted_fields = self._format_fields(fields, DEFAULT_K_FIELDS)
+            with baostock_login_context():
+                rs = query_with_relogin(
+                    bs.query_history_k_data_plus, code, formatted_fields, start_date=start_date,
+                    end_date=end_date, frequency=frequency, adjustflag=adjust_flag)
+                _check_rs(rs, "K线", subject)
+                rows = _drain_rs_rows(rs)
+
+            if not rows:
+                logger.warning("未找到 %s 的 K线 数据 (Baostock 返回空结果集)。", subject)
+                raise NoDataFoundError(
+                    f"未找到 {subject} 的 K线 数据 (空结果集)。")
+            return _rows_to_arrow(rows, rs.fields, K_FIELD_DTYPES)
 
+    def get_historical_k_data_many(
+        self,
+        codes: List[str],
+        start_date: str,
+        end_date: str,
+        frequency: str = "d",
+        adjust_flag: str = "3",
+        fields: Optional[List[str]] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        使用 Baostock 在一次登录中获取多只股票的历史K线数据。
+
+        Baostock 只有一个进程级连接，查询无法真正并行；共享登录省去了每只股票一次的登录/登出往返。
+        没有数据的代码会被跳过并记录警告。
+
+        Returns:
+            Dict[str, pd.DataFrame]: 股票代码到K线 DataFrame 的映射，顺序与 codes 一致。
+
+        Raises:
+            NoDataFoundError: 如果所有代码都没有数据。
+        """
+        subject = f"{len(codes)} 只股票 ({start_date} 到 {end_date})，频率={frequency}，复权={adjust_flag}"
+        logger.info("正在批量获取 K线 数据，%s", subject)
+        with _translate_errors("K线", subject):
+            formatted_fields = self._format_fields(fields, DEFAULT_K_FIELDS)
+            results: Dict[str, pd.DataFrame] = {}
             with baostock_login_context():
-                rs = bs.query_history_k_data_plus(
-                    code,
-                    formatted_fields,
-                    start_date=start_date,
-                    end_date=end_date,
-                    frequency=frequency,
-                    adjustflag=adjust_flag
-                )
-
-                if rs.error_code != '0':
-                    logger.error(
-                        f"Baostock API 错误 (K线数据) for {code}: {rs.error_msg} (错误码: {rs.error_code})")
-                    if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                        raise NoDataFoundError(
-                            f"在指定范围内未找到 {code} 的历史数据。Baostock 消息: {rs.error_msg}")
-                    else:
-                        raise DataSourceError(
-                            f"获取K线数据时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
-
-                if not data_list:
-                    logger.warning(
-                        f"在指定范围内未找到 {code} 的历史数据 (Baostock 返回空结果集)。")
-                    raise NoDataFoundError(
-                        f"在指定范围内未找到 {code} 的历史数据 (空结果集)。")
-
-                result_df = pd.DataFrame(data_list, columns=rs.fields)
-                logger.info(f"已为 {code} 获取 {len(result_df)} 条记录。")
-                return result_df
-
-        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
-            logger.warning(
-                f"为 {code} 获取K线数据时捕获到已知错误: {type(e).__name__}")
-            raise e
-        except Exception as e:
-            logger.exception(
-                f"为 {code} 获取K线数据时发生未知错误: {e}")
-            raise DataSourceError(
-                f"为 {code} 获取K线数据时发生未知错误: {e}")
+                for code in codes:
+                    try:
+                        results[code] = _query_data(
+                            bs.query_history_k_data_plus, "K线", f"{code} ({start_date} 到 {end_date})",
+                            code, formatted_fields, start_date=start_date, end_date=end_date,
+                            frequency=frequency, adjustflag=adjust_flag, dtypes=K_FIELD_DTYPES)
+                    except NoDataFoundError:
+                        logger.warning("批量获取K线数据时跳过无数据的代码: %s", code)
+
+            if not results:
+                raise NoDataFoundError(
+                    f"在指定范围内未找到 {', '.join(codes)} 的历史数据。")
+            return results
 
     def get_stock_basic_info(self, code: str, fields: Optional[List[str]] = None) -> pd.DataFrame:
         """使用 Baostock 获取股票基本信息。"""
-        logger.info(f"正在获取 {code} 的基本信息")
-        try:
-            logger.debug(
-                f"正在请求 {code} 的基本信息。可选字段: {fields}")
-
-            with baostock_login_context():
-                rs = bs.query_stock_basic(code=code)
-
-                if rs.error_code != '0':
-                    logger.error(
-                        f"Baostock API 错误 (基本信息) for {code}: {rs.error_msg} (错误码: {rs.error_code})")
-                    if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                        raise NoDataFoundError(
-                            f"未找到 {code} 的基本信息。Baostock 消息: {rs.error_msg}")
-                    else:
-                        raise DataSourceError(
-                            f"获取基本信息时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
-
-                if not data_list:
-                    logger.warning(
-                        f"未找到 {code} 的基本信息 (Baostock 返回空结果集)。")
-                    raise NoDataFoundError(
-                        f"未找到 {code} 的基本信息 (空结果集)。")
-
-                result_df = pd.DataFrame(data_list, columns=rs.fields)
-                logger.info(
-                    f"已获取 {code} 的基本信息。列: {result_df.columns.tolist()}")
-
-                if fields:
-                    available_cols = [
-                        col for col in fields if col in result_df.columns]
-                    if not available_cols:
-                        raise ValueError(
-                            f"请求的字段 {fields} 在基本信息结果中均不可用。")
-                    logger.debug(
-                        f"为 {code} 的基本信息选择列: {available_cols}")
-                    result_df = result_df[available_cols]
-
-                return result_df
-
-        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
-            logger.warning(
-                f"获取 {code} 的基本信息时捕获到已知错误: {type(e).__name__}")
-            raise e
-        except Exception as e:
-            logger.exception(
-                f"获取 {code} 的基本信息时发生未知错误: {e}")
-            raise DataSourceError(
-                f"获取 {code} 的基本信息时发生未知错误: {e}")
+        logger.debug("正在请求 %s 的基本信息。可选字段: %s", code, fields)
+        return _fetch_data(
+            bs.query_stock_basic, "基本信息", f"代码 {code}", code=code, keep_columns=fields)
 
     def get_dividend_data(self, code: str, year: str, year_type: str = "report") -> pd.DataFrame:
         """使用 Baostock 获取分红信息。"""
-        logger.info(
-            f"正在获取 {code} 的分红数据，年份={year}，年份类型={year_type}")
-        try:
-            with baostock_login_context():
-                rs = bs.query_dividend_data(
-                    code=code, year=year, yearType=year_type)
-
-                if rs.error_code != '0':
-                    logger.error(
-                        f"Baostock API 错误 (分红) for {code}: {rs.error_msg} (错误码: {rs.error_code})")
-                    if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                        raise NoDataFoundError(
-                            f"未找到 {code} 在 {year} 年的分红数据。Baostock 消息: {rs.error_msg}")
-                    else:
-                        raise DataSourceError(
-                            f"获取分红数据时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
-
-                if not data_list:
-                    logger.warning(
-                        f"未找到 {code} 在 {year} 年的分红数据 (Baostock 返回空结果集)。")
-                    raise NoDataFoundError(
-                        f"未找到 {code} 在 {year} 年的分红数据 (空结果集)。")
-
-                result_df = pd.DataFrame(data_list, columns=rs.fields)
-                logger.info(
-                    f"已为 {code} 在 {year} 年获取 {len(result_df)} 条分红记录。")
-                return result_df
-
-        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
-            logger.warning(
-                f"获取 {code} 的分红数据时捕获到已知错误: {type(e).__name__}")
-            raise e
-        except Exception as e:
-            logger.exception(
-                f"获取 {code} 的分红数据时发生未知错误: {e}")
-            raise DataSourceError(
-                f"获取 {code} 的分红数据时发生未知错误: {e}")
+        return _fetch_data(
+            bs.query_dividend_data, "分红", f"代码 {code}，年份={year}，年份类型={year_type}",
+            code=code, year=year, yearType=year_type)
 
     def get_adjust_factor_data(self, code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """使用 Baostock 获取复权因子数据。"""
-        logger.info(
-            f"正在获取 {code} 的复权因子数据 ({start_date} 到 {end_date})")
-        try:
-            with baostock_login_context():
-                rs = bs.query_adjust_factor(
-                    code=code, start_date=start_date, end_date=end_date)
-
-                if rs.error_code != '0':
-                    logger.error(
-                        f"Baostock API 错误 (复权因子) for {code}: {rs.error_msg} (错误码: {rs.error_code})")
-                    if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                        raise NoDataFoundError(
-                            f"在指定范围内未找到 {code} 的复权因子数据。Baostock 消息: {rs.error_msg}")
-                    else:
-                        raise DataSourceError(
-                            f"获取复权因子数据时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
-
-                if not data_list:
-                    logger.warning(
-                        f"在指定范围内未找到 {code} 的复权因子数据 (Baostock 返回空结果集)。")
-                    raise NoDataFoundError(
-                        f"在指定范围内未找到 {code} 的复权因子数据 (空结果集)。")
-
-                result_df = pd.DataFrame(data_list, columns=rs.fields)
-                logger.info(
-                    f"已为 {code} 获取 {len(result_df)} 条复权因子记录。")
-                return result_df
-
-        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
-            logger.warning(
-                f"获取 {code} 的复权因子数据时捕获到已知错误: {type(e).__name__}")
-            raise e
-        except Exception as e:
-            logger.exception(
-                f"获取 {code} 的复权因子数据时发生未知错误: {e}")
-            raise DataSourceError(
-                f"获取 {code} 的复权因子数据时发生未知错误: {e}")
+        return _fetch_data(
+            bs.query_adjust_factor, "复权因子", f"{code} ({start_date} 到 {end_date})",
+            code=code, start_date=start_date, end_date=end_date, dtypes=ADJUST_FACTOR_DTYPES)
 
     def get_profit_data(self, code: str, year: str, quarter: int) -> pd.DataFrame:
         """使用 Baostock 获取季度盈利能力数据。"""
-        return _fetch_financial_data(bs.query_profit_data, "盈利能力", code, year, quarter)
+        return _fetch_financial_data(*FINANCIAL_QUERIES["profit"], code, year, quarter)
 
     def get_operation_data(self, code: str, year: str, quarter: int) -> pd.DataFrame:
         """使用 Baostock 获取季度运营能力数据。"""
-        return _fetch_financial_data(bs.query_operation_data, "运营能力", code, year, quarter)
+        return _fetch_financial_data(*FINANCIAL_QUERIES["operation"], code, year, quarter)
 
     def get_growth_data(self, code: str, year: str, quarter: int) -> pd.DataFrame:
         """使用 Baostock 获取季度成长能力数据。"""
-        return _fetch_financial_data(bs.query_growth_data, "成长能力", code, year, quarter)
+        return _fetch_financial_data(*FINANCIAL_QUERIES["growth"], code, year, quarter)
 
     def get_balance_data(self, code: str, year: str, quarter: int) -> pd.DataFrame:
         """使用 Baostock 获取季度偿债能力数据。"""
-        return _fetch_financial_data(bs.query_balance_data, "资产负债", code, year, quarter)
+        return _fetch_financial_data(*FINANCIAL_QUERIES["balance"], code, year, quarter)
 
     def get_cash_flow_data(self, code: str, year: str, quarter: int) -> pd.DataFrame:
         """使用 Baostock 获取季度现金流量数据。"""
-        return _fetch_financial_data(bs.query_cash_flow_data, "现金流量", code, year, quarter)
+        return _fetch_financial_data(*FINANCIAL_QUERIES["cash_flow"], code, year, quarter)
 
     def get_dupont_data(self, code: str, year: str, quarter: int) -> pd.DataFrame:
         """使用 Baostock 获取季度杜邦指数数据。"""
-        return _fetch_financial_data(bs.query_dupont_data, "杜邦指数", code, year, quarter)
+        return _fetch_financial_data(*FINANCIAL_QUERIES["dupont"], code, year, quarter)
+
+    def get_financial_all(
+        self,
+        code: str,
+        year: str,
+        quarter: int,
+        kinds: Optional[List[str]] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        使用 Baostock 在一次登录中获取一只股票某季度的多类财务数据。
+
+        Args:
+            code (str): 股票代码 (例如, 'sh.600000')。
+            year (str): 年份 (例如, '2023')。
+            quarter (int): 季度 (1-4)。
+            kinds (Optional[List[str]], optional): FINANCIAL_QUERIES 中的数据代号
+                ('profit', 'operation', 'growth', 'balance', 'cash_flow', 'dupont')。默认为全部。
+
+        Returns:
+            Dict[str, pd.DataFrame]: 数据代号到 DataFrame 的映射，顺序与 kinds 一致；没有数据的类别会被跳过并记录警告。
+
+        Raises:
+            ValueError: 如果数据代号未知。
+            NoDataFoundError: 如果所有类别都没有数据。
+        """
+        kinds = list(FINANCIAL_QUERIES) if kinds is None else kinds
+        unknown = [k for k in kinds if k not in FINANCIAL_QUERIES]
+        if unknown:
+            raise ValueError(
+                f"未知的财务数据代号: {unknown}。有效选项为: {list(FINANCIAL_QUERIES)}")
+        subject = f"代码 {code}，{year}年Q{quarter}"
+        data_type_name = "、".join(FINANCIAL_QUERIES[k][1] for k in kinds)
+        logger.info("正在获取 %s 数据，%s", data_type_name, subject)
+        with _translate_errors(data_type_name, subject):
+            results: Dict[str, pd.DataFrame] = {}
+            with baostock_login_context():
+                for kind in kinds:
+                    bs_query_func, kind_name = FINANCIAL_QUERIES[kind]
+                    try:
+                        results[kind] = _query_data(
+                            bs_query_func, kind_name, subject, code=code, year=year, quarter=quarter)
+                    except NoDataFoundError:
+                        logger.warning("批量获取财务数据时跳过无数据的类别: %s", kind_name)
+
+            if not results:
+                raise NoDataFoundError(
+                    f"未找到 {subject} 的 {data_type_name} 数据。")
+            return results
+
+    def get_financial_data_many(self, kind: str, codes: List[str], year: str, quarter: int) -> Dict[str, pd.DataFrame]:
+        """
+        使用 Baostock 在一次会话中获取多只股票同一季度的同类财务数据。
+
+        Baostock 没有多代码的财务查询接口，这里在一次会话锁内依次查询，
+        避免每只股票各自排队获取会话。没有数据的代码会被跳过并记录警告。
+
+        Raises:
+            ValueError: 如果数据类别未知。
+        """
+        if kind not in FINANCIAL_QUERIES:
+            raise ValueError(
+                f"未知的财务数据代号: {kind}。有效选项为: {list(FINANCIAL_QUERIES)}")
+        bs_query_func, data_type_name = FINANCIAL_QUERIES[kind]
+        subject = f"{len(codes)} 只股票，{year}年Q{quarter}"
+        logger.info("正在批量获取 %s 数据，%s", data_type_name, subject)
+        with _translate_errors(data_type_name, subject):
+            results: Dict[str, pd.DataFrame] = {}
+            with baostock_login_context():
+                for code in codes:
+                    try:
+                        results[code] = _query_data(
+                            bs_query_func, data_type_name, f"代码 {code}，{year}年Q{quarter}",
+                            code=code, year=year, quarter=quarter)
+                    except NoDataFoundError:
+                        logger.warning("批量获取%s数据时跳过无数据的代码: %s", data_type_name, code)
+            return results
 
     def get_performance_express_report(self, code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """使用 Baostock 获取业绩快报。"""
-        logger.info(
-            f"正在获取 {code} 的业绩快报 ({start_date} 到 {end_date})")
-        try:
-            with baostock_login_context():
-                rs = bs.query_performance_express_report(
-                    code=code, start_date=start_date, end_date=end_date)
-
-                if rs.error_code != '0':
-                    logger.error(
-                        f"Baostock API 错误 (业绩快报) for {code}: {rs.error_msg} (错误码: {rs.error_code})")
-                    if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                        raise NoDataFoundError(
-                            f"在 {start_date}-{end_date} 范围内未找到 {code} 的业绩快报。Baostock 消息: {rs.error_msg}")
-                    else:
-                        raise DataSourceError(
-                            f"获取业绩快报时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
-
-                if not data_list:
-                    logger.warning(
-                        f"在 {start_date}-{end_date} 范围内未找到 {code} 的业绩快报 (空结果集)。")
-                    raise NoDataFoundError(
-                        f"在 {start_date}-{end_date} 范围内未找到 {code} 的业绩快报 (空结果集)。")
-
-                result_df = pd.DataFrame(data_list, columns=rs.fields)
-                logger.info(
-                    f"已为 {code} 获取 {len(result_df)} 条业绩快报记录。")
-                return result_df
-
-        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
-            logger.warning(
-                f"获取 {code} 的业绩快报时捕获到已知错误: {type(e).__name__}")
-            raise e
-        except Exception as e:
-            logger.exception(
-                f"获取 {code} 的业绩快报时发生未知错误: {e}")
-            raise DataSourceError(
-                f"获取 {code} 的业绩快报时发生未知错误: {e}")
+        return _fetch_data(
+            bs.query_performance_express_report, "业绩快报", f"{code} ({start_date} 到 {end_date})",
+            code=code, start_date=start_date, end_date=end_date)
 
     def get_forecast_report(self, code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """使用 Baostock 获取业绩预告。"""
-        logger.info(
-            f"正在获取 {code} 的业绩预告 ({start_date} 到 {end_date})")
-        try:
-            with baostock_login_context():
-                rs = bs.query_forecast_report(
-                    code=code, start_date=start_date, end_date=end_date)
-
-                if rs.error_code != '0':
-                    logger.error(
-                        f"Baostock API 错误 (业绩预告) for {code}: {rs.error_msg} (错误码: {rs.error_code})")
-                    if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                        raise NoDataFoundError(
-                            f"在 {start_date}-{end_date} 范围内未找到 {code} 的业绩预告。Baostock 消息: {rs.error_msg}")
-                    else:
-                        raise DataSourceError(
-                            f"获取业绩预告时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
-
-                if not data_list:
-                    logger.warning(
-                        f"在 {start_date}-{end_date} 范围内未找到 {code} 的业绩预告 (空结果集)。")
-                    raise NoDataFoundError(
-                        f"在 {start_date}-{end_date} 范围内未找到 {code} 的业绩预告 (空结果集)。")
-
-                result_df = pd.DataFrame(data_list, columns=rs.fields)
-                logger.info(
-                    f"已为 {code} 获取 {len(result_df)} 条业绩预告记录。")
-                return result_df
-
-        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
-            logger.warning(
-                f"获取 {code} 的业绩预告时捕获到已知错误: {type(e).__name__}")
-            raise e
-        except Exception as e:
-            logger.exception(
-                f"获取 {code} 的业绩预告时发生未知错误: {e}")
-            raise DataSourceError(
-                f"获取 {code} 的业绩预告时发生未知错误: {e}")
+        return _fetch_data(
+            bs.query_forecast_report, "业绩预告", f"{code} ({start_date} 到 {end_date})",
+            code=code, start_date=start_date, end_date=end_date)
 
     def get_stock_industry(self, code: Optional[str] = None, date: Optional[str] = None) -> pd.DataFrame:
         """使用 Baostock 获取行业分类数据。"""
-        log_msg = f"正在获取行业数据，代码={code or '全部'}，日期={date or '最新'}"
-        logger.info(log_msg)
-        try:
-            with baostock_login_context():
-                rs = bs.query_stock_industry(code=code, date=date)
-
-                if rs.error_code != '0':
-                    logger.error(
-                        f"Baostock API 错误 (行业) for {code}, {date}: {rs.error_msg} (错误码: {rs.error_code})")
-                    if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                        raise NoDataFoundError(
-                            f"未找到 {code}, {date} 的行业数据。Baostock 消息: {rs.error_msg}")
-                    else:
-                        raise DataSourceError(
-                            f"获取行业数据时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
-
-                if not data_list:
-                    logger.warning(
-                        f"未找到 {code}, {date} 的行业数据 (空结果集)。")
-                    raise NoDataFoundError(
-                        f"未找到 {code}, {date} 的行业数据 (空结果集)。")
-
-                result_df = pd.DataFrame(data_list, columns=rs.fields)
-                logger.info(
-                    f"已为 {code or '全部'}, {date or '最新'} 获取 {len(result_df)} 条行业记录。")
-                return result_df
-
-        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
-            logger.warning(
-                f"获取 {code}, {date} 的行业数据时捕获到已知错误: {type(e).__name__}")
-            raise e
-        except Exception as e:
-            logger.exception(
-                f"获取 {code}, {date} 的行业数据时发生未知错误: {e}")
-            raise DataSourceError(
-                f"获取 {code}, {date} 的行业数据时发生未知错误: {e}")
+        return _fetch_data(
+            bs.query_stock_industry, "行业", f"代码={code or '全部'}，日期={date or '最新'}",
+            code=code, date=date)
 
     def get_sz50_stocks(self, date: Optional[str] = None) -> pd.DataFrame:
         """使用 Baostock 获取上证50指数成分股。"""
-        return _fetch_index_constituent_data(bs.query_sz50_stocks, "上证50", date)
+        return _fetch_index_constituent_batch(["sz50"], date)["sz50"]
 
     def get_hs300_stocks(self, date: Optional[str] = None) -> pd.DataFrame:
         """使用 Baostock 获取沪深300指数成分股。"""
-        return _fetch_index_constituent_data(bs.query_hs300_stocks, "沪深300", date)
+        return _fetch_index_constituent_batch(["hs300"], date)["hs300"]
 
     def get_zz500_stocks(self, date: Optional[str] = None) -> pd.DataFrame:
         """使用 Baostock 获取中证500指数成分股。"""
-        return _fetch_index_constituent_data(bs.query_zz500_stocks, "中证500", date)
+        return _fetch_index_constituent_batch(["zz500"], date)["zz500"]
+
+    def get_index_constituents_batch(self, indexes: List[str], date: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """使用 Baostock 在一次登录中获取多个指数 ('sz50', 'hs300', 'zz500') 的成分股。"""
+        return _fetch_index_constituent_batch(indexes, date)
 
     def get_trade_dates(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """使用 Baostock 获取交易日。"""
-        logger.info(
-            f"正在获取交易日，从 {start_date or '默认'} 到 {end_date or '默认'}")
-        try:
-            with baostock_login_context():
-                rs = bs.query_trade_dates(
-                    start_date=start_date, end_date=end_date)
-
-                if rs.error_code != '0':
-                    logger.error(
-                        f"Baostock API 错误 (交易日): {rs.error_msg} (错误码: {rs.error_code})")
-                    raise DataSourceError(
-                        f"获取交易日时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
-
-                if not data_list:
-                    logger.warning(
-                        f"在 {start_date}-{end_date} 范围内未返回交易日 (空结果集)。")
-                    raise NoDataFoundError(
-                        f"在 {start_date}-{end_date} 范围内未找到交易日 (空结果集)。")
-
-                result_df = pd.DataFrame(data_list, columns=rs.fields)
-                logger.info(f"已获取 {len(result_df)} 条交易日记录。")
-                return result_df
-
-        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
-            logger.warning(
-                f"获取交易日时捕获到已知错误: {type(e).__name__}")
-            raise e
-        except Exception as e:
-            logger.exception(f"获取交易日时发生未知错误: {e}")
-            raise DataSourceError(
-                f"获取交易日时发生未知错误: {e}")
+        return _fetch_data(
+            bs.query_trade_dates, "交易日", f"从 {start_date or '默认'} 到 {end_date or '默认'}",
+            start_date=start_date, end_date=end_date)
 
     def get_all_stock(self, date: Optional[str] = None) -> pd.DataFrame:
         """使用 Baostock 获取某日的全部股票列表。"""
-        logger.info(f"正在获取全部股票列表，日期={date or '默认'}")
-        try:
-            with baostock_login_context():
-                rs = bs.query_all_stock(day=date)
-
-                if rs.error_code != '0':
-                    logger.error(
-                        f"Baostock API 错误 (全部股票) for date {date}: {rs.error_msg} (错误码: {rs.error_code})")
-                    if "no record found" in rs.error_msg.lower() or rs.error_code == '10002':
-                        raise NoDataFoundError(
-                            f"未找到日期 {date} 的股票数据。Baostock 消息: {rs.error_msg}")
-                    else:
-                        raise DataSourceError(
-                            f"获取全部股票列表时 Baostock API 发生错误: {rs.error_msg} (错误码: {rs.error_code})")
-
-                data_list = []
-                while rs.next():
-                    data_list.append(rs.get_row_data())
-
-                if not data_list:
-                    logger.warning(
-                        f"日期 {date} 未返回股票列表 (空结果集)。")
-                    raise NoDataFoundError(
-                        f"日期 {date} 未找到股票列表 (空结果集)。")
-
-                result_df = pd.DataFrame(data_list, columns=rs.fields)
-                logger.info(
-                    f"已为日期 {date or '默认'} 获取 {len(result_df)} 条股票记录。")
-                return result_df
-
-        except (LoginError, NoDataFoundError, DataSourceError, ValueError) as e:
-            logger.warning(
-                f"为日期 {date} 获取全部股票列表时捕获到已知错误: {type(e).__name__}")
-            raise e
-        except Exception as e:
-            logger.exception(
-                f"为日期 {date} 获取全部股票列表时发生未知错误: {e}")
-            raise DataSourceError(
-                f"为日期 {date} 获取全部股票列表时发生未知错误: {e}")
+        return _fetch_data(bs.query_all_stock, "全部股票", f"日期={date or '默认'}", day=date)
 
     def get_deposit_rate_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """使用 Baostock 获取存款基准利率。"""
-        return _fetch_macro_data(bs.query_deposit_rate_data, "存款利率", start_date, end_date)
+        return _fetch_macro_batch(["deposit_rate"], start_date, end_date)["deposit_rate"]
 
     def get_loan_rate_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """使用 Baostock 获取贷款基准利率。"""
-        return _fetch_macro_data(bs.query_loan_rate_data, "贷款利率", start_date, end_date)
+        return _fetch_macro_batch(["loan_rate"], start_date, end_date)["loan_rate"]
 
     def get_required_reserve_ratio_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None, year_type: str = '0') -> pd.DataFrame:
         """使用 Baostock 获取存款准备金率。"""
-        return _fetch_macro_data(bs.query_required_reserve_ratio_data, "存款准备金率", start_date, end_date, yearType=year_type)
+        return _fetch_macro_batch(
+            ["required_reserve_ratio"], start_date, end_date,
+            {"required_reserve_ratio": {"yearType": year_type}})["required_reserve_ratio"]
 
     def get_money_supply_data_month(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """使用 Baostock 获取月度货币供应量。"""
-        return _fetch_macro_data(bs.query_money_supply_data_month, "月度货币供应量", start_date, end_date)
+        return _fetch_macro_batch(["money_supply_month"], start_date, end_date)["money_supply_month"]
 
     def get_money_supply_data_year(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """使用 Baostock 获取年度货币供应量。"""
-        return _fetch_macro_data(bs.query_money_supply_data_year, "年度货币供应量", start_date, end_date)
+        return _fetch_macro_batch(["money_supply_year"], start_date, end_date)["money_supply_year"]
+
+    def get_macro_data_batch(
+        self,
+        kinds: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        year_type: str = '0'
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        使用 Baostock 在一次登录中获取多种宏观经济数据。
+
+        kinds 取 MACRO_QUERIES 中的代号；year_type 仅用于 'required_reserve_ratio'。
+        """
+        return _fetch_macro_batch(
+            kinds, start_date, end_date,
+            {"required_reserve_ratio": {"yearType": year_type}})
 
     # 注意: SHIBOR 在当前使用的 Baostock API 绑定中不可用; 未实现。
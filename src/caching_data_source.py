@@ -0,0 +1,485 @@
+# 为慢变数据提供内存缓存（及可选的 Parquet 磁盘缓存）的 FinancialDataSource 装饰器
+import contextlib
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .data_source_interface import FinancialDataSource, NoDataFoundError
+
+logger = logging.getLogger(__name__)
+
+# Baostock 每个交易日 17:30 完成日 K 线入库、18:00 完成复权因子入库，
+# 因此以每天 18:00 作为缓存的统一失效时刻。
+REFRESH_HOUR = 18
+
+# 表示永不过期（仅受 LRU 淘汰）的过期时刻
+NEVER = datetime.max
+
+
+def next_refresh_time(now: datetime) -> datetime:
+    """返回 now 之后最近的一次数据刷新时刻（当天或次日的 REFRESH_HOUR 点）。"""
+    boundary = now.replace(hour=REFRESH_HOUR, minute=0, second=0, microsecond=0)
+    if now >= boundary:
+        boundary += timedelta(days=1)
+    return boundary
+
+
+def _until_refresh(now: datetime, arguments: Dict[str, Any]) -> datetime:
+    """结果在一个交易日内不变: 缓存到下一个数据刷新时刻。"""
+    return next_refresh_time(now)
+
+
+def _k_data_expiry(now: datetime, arguments: Dict[str, Any]) -> datetime:
+    """
+    已收盘区间（end_date 早于今天）的不复权/后复权 K 线不会再变化，永久缓存；
+    前复权价格会随新的除权除息整体调整，且包含今天的区间尚未完整，只缓存到下一个刷新时刻。
+    """
+    end_date = arguments.get("end_date") or ""
+    if end_date < now.strftime("%Y-%m-%d") and arguments.get("adjust_flag") != "2":
+        return NEVER
+    return next_refresh_time(now)
+
+
+# 方法名 -> 过期策略 (now, 绑定后的参数) -> 过期时刻
+CACHE_POLICIES: Dict[str, Callable[[datetime, Dict[str, Any]], datetime]] = {
+    # 交易日历、指数成分股、行业分类、证券基本资料、全部证券列表、宏观数据: 每日刷新
+    "get_trade_dates": _until_refresh,
+    "get_sz50_stocks": _until_refresh,
+    "get_hs300_stocks": _until_refresh,
+    "get_zz500_stocks": _until_refresh,
+    "get_stock_industry": _until_refresh,
+    "get_stock_basic_info": _until_refresh,
+    "get_all_stock": _until_refresh,
+    "get_deposit_rate_data": _until_refresh,
+    "get_loan_rate_data": _until_refresh,
+    "get_required_reserve_ratio_data": _until_refresh,
+    "get_money_supply_data_month": _until_refresh,
+    "get_money_supply_data_year": _until_refresh,
+    # 历史 K 线: 已收盘区间永久缓存
+    "get_historical_k_data": _k_data_expiry,
+}
+
+
+def _freeze(value: Any) -> Any:
+    """把列表等不可哈希的参数值转换为可作为缓存键的元组。"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class ParquetDiskCache:
+    """
+    把缓存结果以 Parquet 文件保存在磁盘上，跨进程复用。
+
+    文件路径为 {root}/{方法名}/{缓存键的 SHA-1}.parquet。会过期的结果（交易日历、
+    指数成分股、行业分类等）另有同名 .json 文件记录过期时刻，没有该文件的结果永不过期。
+    读写失败只记录日志，调用方回退到真实查询，因此损坏或不可写的缓存目录不会影响正常使用。
+    需要 pyarrow。
+    """
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root (str): 缓存根目录，不存在时自动创建。
+        """
+        self._root = os.path.expanduser(root)
+
+    def _path(self, key: Tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self._root, key[0], f"{digest}.parquet")
+
+    @staticmethod
+    def _expiry_path(path: str) -> str:
+        return f"{path[:-len('.parquet')]}.json"
+
+    def _read_expiry(self, path: str) -> datetime:
+        try:
+            with open(self._expiry_path(path), encoding="utf-8") as f:
+                return datetime.fromisoformat(json.load(f)["expires_at"])
+        except FileNotFoundError:
+            return NEVER
+
+    def get(self, key: Tuple, now: Optional[datetime] = None) -> Optional[pd.DataFrame]:
+        """读取缓存的结果，不存在、已过期或读取失败时返回 None。"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            if now is not None and now >= self._read_expiry(path):
+                return None
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.warning("读取磁盘缓存 %s 失败，改为重新查询: %s", path, e)
+            return None
+
+    def put(self, key: Tuple, df: pd.DataFrame, expires_at: datetime = NEVER) -> None:
+        """
+        写入结果；先写临时文件再原子替换，避免并发读到半个文件。
+
+        先替换数据文件再更新过期时刻：并发读者最多看到新数据配旧的（已过期的）时刻而放弃命中，
+        不会把旧数据当作未过期。
+        """
+        path = self._path(key)
+        expiry_path = self._expiry_path(path)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            df.to_parquet(path + suffix, compression="zstd")
+            os.replace(path + suffix, path)
+            if expires_at is NEVER:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(expiry_path)
+            else:
+                with open(expiry_path + suffix, "w", encoding="utf-8") as f:
+                    json.dump({"expires_at": expires_at.isoformat()}, f)
+                os.replace(expiry_path + suffix, expiry_path)
+        except Exception as e:
+            logger.warning("写入磁盘缓存 %s 失败: %s", path, e)
+            for tmp_path in (path + suffix, expiry_path + suffix):
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+
+
+def _shift_day(date: str, days: int) -> str:
+    """把 'YYYY-MM-DD' 日期前后移动若干天。"""
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+class KLineRangeStore:
+    """
+    按 (代码, 频率, 复权方式, 字段) 分文件保存历史 K 线的 Parquet 区间缓存。
+
+    每个文件保存一段连续日期区间的全部 K 线，并在同名 .json 文件中记录覆盖的区间。
+    请求落在已覆盖区间内时按日期谓词下推只读取需要的行；超出部分只向数据源查询缺口
+    （向前或向后补齐，使覆盖区间保持连续）并追加到文件。今天及以后的 K 线可能尚未完整，
+    总是实时查询且不写入文件。前复权（adjust_flag='2'）价格会随除权除息整体变化，
+    不使用本缓存。需要 pyarrow。
+    """
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root (str): 缓存根目录，不存在时自动创建。
+        """
+        self._root = os.path.expanduser(root)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def accepts(arguments: Dict[str, Any]) -> bool:
+        """判断一次 get_historical_k_data 调用能否由区间缓存处理。"""
+        fields = arguments.get("fields")
+        return (
+            arguments.get("adjust_flag") != "2"
+            and arguments.get("chunksize") is None
+            and (fields is None or "date" in fields)
+        )
+
+    def _paths(self, code: str, frequency: str, adjust_flag: str, fields: Optional[List[str]]) -> Tuple[str, str]:
+        fields_tag = hashlib.sha1(repr(fields).encode("utf-8")).hexdigest()[:8]
+        stem = os.path.join(self._root, f"{code}_{frequency}_{adjust_flag}_{fields_tag}")
+        return f"{stem}.parquet", f"{stem}.json"
+
+    @staticmethod
+    def _query(method: Callable, arguments: Dict[str, Any], start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """向数据源查询一段区间，没有数据时返回 None。"""
+        try:
+            return method(**{**arguments, "start_date": start_date, "end_date": end_date})
+        except NoDataFoundError:
+            return None
+
+    def fetch(self, method: Callable, arguments: Dict[str, Any], now: datetime) -> pd.DataFrame:
+        """
+        返回 [start_date, end_date] 区间的 K 线，优先使用磁盘上已覆盖的部分。
+
+        Args:
+            method (Callable): 真实数据源的 get_historical_k_data。
+            arguments (Dict[str, Any]): 绑定并补全默认值后的调用参数。
+            now (datetime): 当前时刻，用于区分已收盘与未完整的 K 线。
+
+        Returns:
+            pd.DataFrame: 与直接查询数据源相同列的 K 线数据。
+
+        Raises:
+            NoDataFoundError: 如果区间内没有任何数据。
+        """
+        start_date, end_date = arguments["start_date"], arguments["end_date"]
+        today = now.strftime("%Y-%m-%d")
+        frames = []
+
+        # 今天之前的部分走磁盘区间缓存
+        stored_end = min(end_date, _shift_day(today, -1))
+        if start_date <= stored_end:
+            with self._lock:
+                stored = self._fetch_stored(method, arguments, start_date, stored_end)
+            if stored is not None:
+                frames.append(stored)
+
+        # 今天及以后的部分实时查询
+        live_start = max(start_date, today)
+        if live_start <= end_date:
+            live = self._query(method, arguments, live_start, end_date)
+            if live is not None:
+                frames.append(live)
+
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            raise NoDataFoundError(
+                f"未找到 {arguments['code']} 在 {start_date} 到 {end_date} 的 K线 数据。")
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    def _fetch_stored(
+        self, method: Callable, arguments: Dict[str, Any], start_date: str, end_date: str
+    ) -> Optional[pd.DataFrame]:
+        path, coverage_path = self._paths(
+            arguments["code"], arguments["frequency"], arguments["adjust_flag"], arguments.get("fields"))
+        coverage = None
+        try:
+            if os.path.exists(path):
+                with open(coverage_path, encoding="utf-8") as f:
+                    coverage = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("读取 K线 区间缓存 %s 失败，改为重新查询: %s", coverage_path, e)
+
+        if coverage is not None and coverage["start"] <= start_date and end_date <= coverage["end"]:
+            try:
+                logger.debug("K线 区间缓存命中: %s (%s 到 %s)", path, start_date, end_date)
+                return pd.read_parquet(
+                    path, filters=[("date", ">=", start_date), ("date", "<=", end_date)])
+            except Exception as e:
+                logger.warning("读取 K线 区间缓存 %s 失败，改为重新查询: %s", path, e)
+                coverage = None
+
+        if coverage is None:
+            lo, hi = start_date, end_date
+            pieces = [self._query(method, arguments, lo, hi)]
+        else:
+            # 只查询缺口；新请求与已覆盖区间不相邻时一并补齐中间部分，保持覆盖区间连续
+            lo, hi = min(start_date, coverage["start"]), max(end_date, coverage["end"])
+            pieces = []
+            if lo < coverage["start"]:
+                pieces.append(self._query(method, arguments, lo, _shift_day(coverage["start"], -1)))
+            try:
+                pieces.append(pd.read_parquet(path))
+            except Exception as e:
+                logger.warning("读取 K线 区间缓存 %s 失败，改为重新查询: %s", path, e)
+                lo, hi = start_date, end_date
+                pieces = [self._query(method, arguments, lo, hi)]
+            else:
+                if hi > coverage["end"]:
+                    pieces.append(self._query(method, arguments, _shift_day(coverage["end"], 1), hi))
+
+        pieces = [df for df in pieces if df is not None and not df.empty]
+        if not pieces:
+            return None
+        combined = pieces[0] if len(pieces) == 1 else pd.concat(pieces, ignore_index=True)
+        self._write(path, coverage_path, combined, lo, hi)
+        dates = combined["date"]
+        return combined[(dates >= start_date) & (dates <= end_date)].reset_index(drop=True)
+
+    def _write(self, path: str, coverage_path: str, df: pd.DataFrame, start: str, end: str) -> None:
+        """先替换数据文件再更新覆盖区间，读者不会看到超出数据范围的覆盖区间。"""
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self._root, exist_ok=True)
+            df.to_parquet(path + suffix, compression="zstd")
+            os.replace(path + suffix, path)
+            with open(coverage_path + suffix, "w", encoding="utf-8") as f:
+                json.dump({"start": start, "end": end}, f)
+            os.replace(coverage_path + suffix, coverage_path)
+        except Exception as e:
+            logger.warning("写入 K线 区间缓存 %s 失败: %s", path, e)
+            for tmp_path in (path + suffix, coverage_path + suffix):
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+
+
+class DailyMemo:
+    """
+    工具层派生结果（行业分组、搜索索引等）的有界内存缓存，条目在下一个数据刷新时刻过期。
+
+    至多保存 maxsize 个条目，超出时淘汰最久未使用的条目；写入时顺带清除已过期的条目，
+    因此调用方传入各不相同的日期时也不会无限增长。
+    """
+
+    def __init__(self, maxsize: int = 4):
+        """
+        Args:
+            maxsize (int, optional): 最多保存的条目数。默认为 4。
+        """
+        self._maxsize = maxsize
+        self._items: "OrderedDict[Any, Tuple[datetime, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, now: datetime) -> Optional[Any]:
+        """返回未过期的值，不存在或已过期时返回 None。"""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            if now >= entry[0]:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Any, value: Any, now: datetime) -> None:
+        """保存 value，直到 now 之后的下一个数据刷新时刻。"""
+        with self._lock:
+            for stale in [k for k, (expires_at, _) in self._items.items() if now >= expires_at]:
+                del self._items[stale]
+            self._items[key] = (next_refresh_time(now), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self._maxsize:
+                self._items.popitem(last=False)
+
+
+class CachingDataSource:
+    """
+    缓存幂等查询结果的数据源装饰器。
+
+    对 CACHE_POLICIES 中的方法按 (方法名, 参数) 缓存返回的 DataFrame，
+    过期时刻由各方法的策略决定；其余方法原样转发给被包装的数据源。
+    参数先按方法签名绑定并补全默认值，因此位置参数和关键字参数写法共享同一条目。
+    异常不会被缓存。指定 disk_cache 时，结果连同过期时刻还会写入磁盘，
+    内存未命中时先查磁盘再查询真实数据源，重启后同一交易日内的重复查询无需访问 Baostock。
+    """
+
+    def __init__(
+        self,
+        source: FinancialDataSource,
+        maxsize: int = 512,
+        max_rows: int = 2_000_000,
+        disk_cache: Optional[ParquetDiskCache] = None,
+        kline_store: Optional[KLineRangeStore] = None,
+    ):
+        """
+        Args:
+            source (FinancialDataSource): 被包装的真实数据源。
+            maxsize (int, optional): 最多缓存的结果数，超出时淘汰最久未使用的条目。默认为 512。
+            max_rows (int, optional): 所有缓存结果的总行数上限，防止长区间 K 线占满内存。默认为 2,000,000。
+            disk_cache (Optional[ParquetDiskCache], optional): 磁盘缓存。默认不启用。
+            kline_store (Optional[KLineRangeStore], optional): 历史 K 线的区间缓存，
+                启用后 K 线不再按精确参数写入 disk_cache。默认不启用。
+        """
+        self._source = source
+        self._disk_cache = disk_cache
+        self._kline_store = kline_store
+        self._maxsize = maxsize
+        self._max_rows = max_rows
+        self._rows = 0
+        self._cache: "OrderedDict[Tuple, Tuple[datetime, pd.DataFrame]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: Tuple, now: datetime):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, df = entry
+            if now >= expires_at:
+                del self._cache[key]
+                self._rows -= len(df)
+                return None
+            self._cache.move_to_end(key)
+            return df
+
+    def _put(self, key: Tuple, df: pd.DataFrame, expires_at: datetime) -> None:
+        if len(df) > self._max_rows:
+            return
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._rows -= len(old[1])
+            self._cache[key] = (expires_at, df)
+            self._rows += len(df)
+            while len(self._cache) > self._maxsize or self._rows > self._max_rows:
+                _, (_, evicted) = self._cache.popitem(last=False)
+                self._rows -= len(evicted)
+
+    def clear(self) -> None:
+        """清空所有缓存条目。"""
+        with self._lock:
+            self._cache.clear()
+            self._rows = 0
+
+    def _cached_call(self, name: str, method, args: Tuple, kwargs: Dict[str, Any]) -> pd.DataFrame:
+        try:
+            bound = inspect.signature(method).bind(*args, **kwargs)
+        except TypeError:
+            # 参数不匹配时交给真实方法抛出原始错误
+            return method(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = bound.arguments
+        key = (name, tuple((k, _freeze(v)) for k, v in arguments.items()))
+        now = datetime.now()
+        df = self._get(key, now)
+        if df is not None:
+            logger.debug("缓存命中: %s%s", name, key[1])
+            return df.copy()
+
+        expires_at = CACHE_POLICIES[name](now, arguments)
+        # 可由 K 线区间缓存处理的请求从区间文件切片得到，不再按精确参数另存一份
+        use_kline_store = (
+            name == "get_historical_k_data" and self._kline_store is not None
+            and self._kline_store.accepts(arguments))
+        disk_cache = None if use_kline_store else self._disk_cache
+        if disk_cache is not None:
+            df = disk_cache.get(key, now)
+            if df is not None:
+                logger.debug("磁盘缓存命中: %s%s", name, key[1])
+                self._put(key, df.copy(), expires_at)
+                return df
+
+        if use_kline_store:
+            df = self._kline_store.fetch(method, arguments, now)
+        else:
+            df = method(*args, **kwargs)
+        if isinstance(df, pd.DataFrame):
+            self._put(key, df.copy(), expires_at)
+            if disk_cache is not None:
+                disk_cache.put(key, df, expires_at)
+        return df
+
+    def get_stock_basic_info(self, code: str, fields: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        返回证券基本资料。
+
+        Baostock 每次都返回全部字段，因此每个代码只缓存一份完整结果，
+        不同 fields 的请求都从中选取列，不会为每种字段组合重新查询。
+
+        Raises:
+            ValueError: 如果 fields 中的列在结果中均不存在。
+        """
+        df = self._cached_call(
+            "get_stock_basic_info", self._source.get_stock_basic_info, (code,), {})
+        if not fields:
+            return df
+        # 与数据源的 keep_columns 一致: 按给定顺序，忽略不存在的列
+        columns = [col for col in fields if col in df.columns]
+        if not columns:
+            raise ValueError(f"请求的字段 {fields} 在基本信息结果中均不可用。")
+        return df[columns]
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._source, name)
+        if name not in CACHE_POLICIES or not callable(attr):
+            return attr
+
+        def cached(*args, **kwargs):
+            return self._cached_call(name, attr, args, kwargs)
+
+        cached.__name__ = name
+        cached.__doc__ = attr.__doc__
+        return cached
+
+
+# 注册为虚拟子类，使 isinstance(proxy, FinancialDataSource) 成立
+FinancialDataSource.register(CachingDataSource)
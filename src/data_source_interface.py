@@ -1,7 +1,12 @@
 # 定义金融数据源的抽象接口
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
-import pandas as pd
-from typing import Optional, List
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, List, Union
+
+if TYPE_CHECKING:
+    # 仅用于类型注解；pandas 导入较慢，不放在服务器启动路径上
+    import pandas as pd
 
 class DataSourceError(Exception):
     """数据源错误基类。"""
@@ -24,6 +29,19 @@ class FinancialDataSource(ABC):
     该类的实现为特定的金融数据API（如 Baostock, Akshare）提供访问。
     """
 
+    def ensure_login(self) -> None:
+        """
+        确保与数据源的会话已建立，已建立时不产生网络往返。
+
+        需要登录的实现应覆盖此方法并在多次调用间复用会话；默认实现不做任何事。
+
+        Raises:
+            LoginError: 如果登录失败。
+        """
+
+    def logout(self) -> None:
+        """结束与数据源的会话（如有）。之后的调用会按需重新登录。默认实现不做任何事。"""
+
     @abstractmethod
     def get_historical_k_data(
         self,
@@ -33,7 +51,8 @@ class FinancialDataSource(ABC):
         frequency: str = "d",
         adjust_flag: str = "3",
         fields: Optional[List[str]] = None,
-    ) -> pd.DataFrame:
+        chunksize: Optional[int] = None,
+    ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         获取指定股票代码的历史K线（OHLCV）数据。
 
@@ -49,9 +68,13 @@ class FinancialDataSource(ABC):
                                          默认为 '3'。
             fields (Optional[List[str]], optional): 需要检索的特定字段列表。如果为 None，
                                                     则检索由实现定义的默认字段。
+            chunksize (Optional[int], optional): 如果指定，则返回每次产出至多 chunksize 行
+                                                 DataFrame 的迭代器，峰值内存与 chunksize 而非总行数成正比。
+                                                 默认为 None，即一次返回完整的 DataFrame。
 
         Returns:
-            pd.DataFrame: 包含历史K线数据的 pandas DataFrame，列名对应请求的字段。
+            Union[pd.DataFrame, Iterator[pd.DataFrame]]: 包含历史K线数据的 pandas DataFrame，列名对应请求的字段；
+                指定 chunksize 时为分块 DataFrame 的迭代器。
 
         Raises:
             LoginError: 如果数据源登录失败。
@@ -82,6 +105,36 @@ class FinancialDataSource(ABC):
         """
         pass
 
+    def get_financial_data_many(self, kind: str, codes: List[str], year: str, quarter: int) -> Dict[str, pd.DataFrame]:
+        """
+        获取多只股票同一季度的同类财务数据。
+
+        默认实现逐只调用实现类的 get_<kind>_data 方法 (例如, get_profit_data)；
+        能在一次请求或一次会话中完成多只股票查询的实现应覆盖此方法。
+
+        Args:
+            kind (str): 数据类别 ('profit', 'operation', 'growth', 'balance', 'cash_flow', 'dupont')。
+            codes (List[str]): 股票代码列表。
+            year (str): 年份 (例如, '2023')。
+            quarter (int): 季度 (1-4)。
+
+        Returns:
+            Dict[str, pd.DataFrame]: 股票代码到 DataFrame 的映射，顺序与 codes 一致；没有数据的代码不在结果中。
+
+        Raises:
+            LoginError: 如果数据源登录失败。
+            DataSourceError: 对于其他数据源相关的错误。
+            AttributeError: 如果实现不支持该数据类别。
+        """
+        method = getattr(self, f"get_{kind}_data")
+        results = {}
+        for code in codes:
+            try:
+                results[code] = method(code=code, year=year, quarter=quarter)
+            except NoDataFoundError:
+                continue
+        return results
+
     @abstractmethod
     def get_trade_dates(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """获取指定范围内的交易日信息。"""
@@ -2,14 +2,97 @@
 Markdown formatting utilities for A-Share MCP Server.
 """
 import pandas as pd
+import base64
 import logging
 import json
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时回退到标准库 json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # Configuration: Max rows to display in string outputs to protect context length
 MAX_MARKDOWN_ROWS = 250
 
+# Placeholder returned for empty results
+NO_DATA_MARKDOWN = "(No data available to display)"
+
+# Shared stand-in for a missing DataFrame; formatters only read it
+_EMPTY_FRAME = pd.DataFrame()
+
+
+def _dumps_json(payload: dict) -> str:
+    """Serializes a payload to a JSON string, using orjson when it is installed.
+
+    orjson always emits UTF-8 without escaping, matching ``ensure_ascii=False``,
+    and serializes numpy scalars natively.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _blank_missing(df: pd.DataFrame) -> pd.DataFrame:
+    """Replaces NaN/NA cells with None so they render as blanks and JSON nulls.
+
+    Numeric columns hold NaN where Baostock returned an empty field (e.g. peTTM
+    for loss makers, suspended days). Frames without missing values are
+    returned unchanged.
+    """
+    missing = df.isna()
+    if not missing.to_numpy().any():
+        return df
+    return df.astype(object).mask(missing, None)
+
+
+def _frame_records(df: pd.DataFrame) -> list:
+    """Converts a DataFrame to a list of row dicts, like ``to_dict(orient="records")``.
+
+    Zipping the column names with ``itertuples`` rows yields the same native
+    Python values but skips the per-cell boxing pass of ``to_dict``, which is
+    about 3x faster on the string-heavy frames Baostock returns. Missing
+    values become None, so they serialize as JSON null rather than NaN.
+    """
+    columns = list(df.columns)
+    df = _blank_missing(df)
+    return [dict(zip(columns, row)) for row in df.itertuples(index=False, name=None)]
+
+
+def _format_arrow(df: pd.DataFrame, meta: dict, fmt: str = "arrow") -> str:
+    """Serializes a DataFrame to a base64-encoded Arrow IPC stream or Parquet file.
+
+    Column types are kept as-is (no per-cell string formatting), so a client
+    can load the result with ``pyarrow.ipc.open_stream`` (or
+    ``pyarrow.parquet.read_table``) without re-parsing. The payload is prefixed
+    with ``"arrow:"`` or ``"parquet:"`` so clients can tell it apart from text
+    output. The meta dict is stored as JSON under the ``meta`` schema metadata key.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        logger.error("The '%s' format was requested but pyarrow is not installed.", fmt)
+        return f"Error: The '{fmt}' format requires pyarrow (pip install a-share-mcp[arrow])."
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b"meta": _dumps_json(meta).encode("utf-8"),
+        })
+        sink = pa.BufferOutputStream()
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, sink, compression="zstd")
+        else:
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+        return f"{fmt}:" + base64.b64encode(sink.getvalue().to_pybytes()).decode("ascii")
+    except Exception as e:
+        logger.error("Error converting DataFrame to %s: %s", fmt, e, exc_info=True)
+        return f"Error: Could not format data into {fmt.capitalize()}."
+
 
 def format_df_to_markdown(df: pd.DataFrame, max_rows: int = None) -> str:
     """Formats a Pandas DataFrame to a Markdown string with row truncation.
@@ -23,7 +106,7 @@ def format_df_to_markdown(df: pd.DataFrame, max_rows: int = None) -> str:
     """
     if df is None or df.empty:
         logger.warning("Attempted to format an empty DataFrame to Markdown.")
-        return "(No data available to display)"
+        return NO_DATA_MARKDOWN
 
     if max_rows is None:
         max_rows = MAX_MARKDOWN_ROWS
@@ -35,7 +118,7 @@ def format_df_to_markdown(df: pd.DataFrame, max_rows: int = None) -> str:
     truncated = original_rows > rows_to_show
 
     try:
-        markdown_table = df_display.to_markdown(index=False)
+        markdown_table = _blank_missing(df_display).to_markdown(index=False)
     except Exception as e:
         logger.error("Error converting DataFrame to Markdown: %s", e, exc_info=True)
         return "Error: Could not format data into Markdown table."
@@ -51,14 +134,20 @@ def format_table_output(
     format: str = "markdown",
     max_rows: int | None = None,
     meta: dict | None = None,
+    total_rows: int | None = None,
 ) -> str:
     """Formats a DataFrame into the requested string format with optional meta.
 
     Args:
         df: Data to format.
-        format: 'markdown' | 'json' | 'csv'. Defaults to 'markdown'.
+        format: 'markdown' | 'json' | 'csv' | 'arrow' | 'parquet'. Defaults to 'markdown'.
+            'arrow' returns "arrow:" + a base64-encoded Arrow IPC stream and 'parquet'
+            returns "parquet:" + a base64-encoded Parquet file (both require pyarrow).
         max_rows: Optional max rows to include (defaults depend on formatters).
         meta: Optional metadata dict to include (prepended for markdown, embedded for json).
+        total_rows: Row count of the full result when df is already a head slice of it,
+            so callers can skip materializing rows that would be truncated anyway.
+            Defaults to len(df).
 
     Returns:
         A string suitable for tool responses.
@@ -69,10 +158,18 @@ def format_table_output(
     if max_rows is None:
         max_rows = MAX_MARKDOWN_ROWS if fmt == "markdown" else MAX_MARKDOWN_ROWS
 
-    total_rows = 0 if df is None else int(df.shape[0])
-    rows_to_show = 0 if df is None else min(total_rows, max_rows)
+    available_rows = 0 if df is None else int(df.shape[0])
+    if total_rows is None:
+        total_rows = available_rows
+    rows_to_show = min(available_rows, max_rows)
     truncated = total_rows > rows_to_show
-    df_display = df.head(rows_to_show) if df is not None else pd.DataFrame()
+    # Empty results (e.g. non-trading days) are common: skip the head() copy and
+    # the per-row conversions below, producing the same output as the full path.
+    empty = available_rows == 0
+    if empty:
+        df_display = _EMPTY_FRAME if df is None else df
+    else:
+        df_display = df.head(rows_to_show)
 
     if fmt == "markdown":
         header = ""
@@ -82,6 +179,8 @@ def format_table_output(
             for k, v in meta.items():
                 lines.append(f"- {k}: {v}")
             header = "\n".join(lines) + "\n\n"
+        if empty:
+            return header + NO_DATA_MARKDOWN
         return header + format_df_to_markdown(df_display, max_rows=max_rows)
 
     if fmt == "csv":
@@ -94,20 +193,28 @@ def format_table_output(
     if fmt == "json":
         try:
             payload = {
-                "data": [] if df_display is None else df_display.to_dict(orient="records"),
+                "data": [] if empty else _frame_records(df_display),
                 "meta": {
                     **(meta or {}),
                     "total_rows": total_rows,
                     "returned_rows": rows_to_show,
                     "truncated": truncated,
-                    "columns": [] if df_display is None else list(df_display.columns),
+                    "columns": list(df_display.columns),
                 },
             }
-            return json.dumps(payload, ensure_ascii=False)
+            return _dumps_json(payload)
         except Exception as e:
             logger.error("Error converting DataFrame to JSON: %s", e, exc_info=True)
             return "Error: Could not format data into JSON."
 
+    if fmt in ("arrow", "parquet"):
+        return _format_arrow(df_display, {
+            **(meta or {}),
+            "total_rows": total_rows,
+            "returned_rows": rows_to_show,
+            "truncated": truncated,
+        }, fmt)
+
     # Fallback to markdown if unknown format
     logger.warning("Unknown format '%s', falling back to markdown", fmt)
     return format_df_to_markdown(df_display, max_rows=max_rows)
@@ -0,0 +1,46 @@
+# 延迟构造的数据源代理，首次使用时才创建真实数据源
+import logging
+import threading
+from typing import Callable, Optional
+
+from .data_source_interface import FinancialDataSource
+
+logger = logging.getLogger(__name__)
+
+
+class LazyDataSource:
+    """
+    FinancialDataSource 的延迟代理。
+
+    真实数据源在首次访问其属性（即首次工具调用）时才通过工厂函数构造，
+    这样仅用于响应 tools/list 的进程不会触碰数据源。
+    """
+
+    def __init__(self, factory: Callable[[], FinancialDataSource]):
+        """
+        Args:
+            factory (Callable[[], FinancialDataSource]): 用于构造真实数据源的无参可调用对象。
+        """
+        self._factory = factory
+        self._instance: Optional[FinancialDataSource] = None
+        self._lock = threading.Lock()
+
+    def _get_instance(self) -> FinancialDataSource:
+        """返回真实数据源，必要时在锁内构造。"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    logger.info("首次使用，正在构造数据源...")
+                    instance = self._factory()
+                    self._instance = instance
+        return instance
+
+    def __getattr__(self, name: str):
+        # 仅在常规属性查找失败时调用，因此不会拦截 _factory/_instance/_lock
+        return getattr(self._get_instance(), name)
+
+
+# 注册为虚拟子类，使 isinstance(proxy, FinancialDataSource) 成立
+FinancialDataSource.register(LazyDataSource)
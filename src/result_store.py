@@ -0,0 +1,79 @@
+# 暂存大体积工具输出，以 MCP 资源的形式按需读取
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 资源 URI 模板，{key} 为输出内容的 SHA-256 前缀
+RESULT_URI_TEMPLATE = "ashare://results/{key}"
+
+# 替换为资源引用时保留的预览长度（字符数）
+PREVIEW_CHARS = 1024
+
+
+class ResultStore:
+    """
+    按内容哈希保存工具输出的有界内存存储。
+
+    相同内容得到相同的键，重复调用不会占用额外空间；
+    超出容量时淘汰最久未读取的条目。
+    """
+
+    def __init__(self, maxsize: int = 64):
+        """
+        Args:
+            maxsize (int, optional): 最多保存的输出数。默认为 64。
+        """
+        self._maxsize = maxsize
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        """
+        保存一段输出并返回其键。
+
+        Args:
+            text (str): 工具输出文本。
+
+        Returns:
+            str: 内容哈希键。
+        """
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self._items[key] = text
+            self._items.move_to_end(key)
+            while len(self._items) > self._maxsize:
+                self._items.popitem(last=False)
+        return key
+
+    def get(self, key: str) -> Optional[str]:
+        """返回键对应的输出，不存在（或已被淘汰）时返回 None。"""
+        with self._lock:
+            text = self._items.get(key)
+            if text is not None:
+                self._items.move_to_end(key)
+            return text
+
+
+def build_preview(text: str, uri: str, limit: int = PREVIEW_CHARS) -> str:
+    """
+    构造替代完整输出的简短响应：按整行截取的预览加资源 URI。
+
+    Args:
+        text (str): 完整输出。
+        uri (str): 保存完整输出的资源 URI。
+        limit (int, optional): 预览的最大字符数。默认为 PREVIEW_CHARS。
+
+    Returns:
+        str: 预览文本。
+    """
+    cut = text.rfind("\n", 0, limit)
+    preview = text[:cut if cut > 0 else limit]
+    return (
+        f"{preview}\n...\n\n"
+        f"输出较大（{len(text)} 个字符），以上仅为预览。完整内容已保存为资源: {uri}\n"
+        f"请通过 resources/read 读取该 URI 获取全部数据。"
+    )
@@ -6,7 +6,7 @@ import logging
 from datetime import datetime, timedelta
 
 from mcp.server.fastmcp import FastMCP
-from src.data_source_interface import FinancialDataSource
+from src.data_source_interface import DataSourceError, FinancialDataSource
 from src.formatting.markdown_formatter import format_df_to_markdown
 
 logger = logging.getLogger(__name__)
@@ -34,7 +34,7 @@ def register_analysis_tools(app: FastMCP, active_data_source: FinancialDataSourc
             str: 数据驱动的分析报告，包含关键财务指标、历史表现和同行业比较。
         """
         logger.info(
-            f"工具 'get_stock_analysis' 已为 {code} 调用，类型={analysis_type}")
+            "工具 'get_stock_analysis' 已为 %s 调用，类型=%s", code, analysis_type)
 
         try:
             basic_info = active_data_source.get_stock_basic_info(code=code)
@@ -137,16 +137,20 @@ def register_analysis_tools(app: FastMCP, active_data_source: FinancialDataSourc
                         report += f"- 同行业股票数量: {len(same_industry)}\n"
 
             except Exception as e:
-                logger.warning(f"获取行业比较数据失败: {e}")
+                logger.warning("获取行业比较数据失败: %s", e)
 
             report += "\n## 数据解读建议\n"
             report += "- 以上数据仅供参考，建议结合公司公告、行业趋势和宏观环境进行综合分析\n"
             report += "- 个股表现受多种因素影响，历史数据不代表未来表现\n"
             report += "- 投资决策应基于个人风险承受能力和投资目标\n"
 
-            logger.info(f"成功生成{code}的分析报告")
+            logger.info("成功生成%s的分析报告", code)
             return report
 
+        except DataSourceError as e:
+            # 无数据、登录失败等数据源错误是预期内的，不记录堆栈
+            logger.warning("分析生成失败 for %s: %s", code, e)
+            return f"分析生成失败: {e}"
         except Exception as e:
-            logger.exception(f"分析生成失败 for {code}: {e}")
+            logger.exception("分析生成失败 for %s: %s", code, e)
             return f"分析生成失败: {e}"
@@ -2,6 +2,8 @@
 MCP 工具的基础实用程序。
 用于以一致的格式和错误处理方式调用数据源的共享辅助函数。
 """
+import asyncio
+import functools
 import logging
 from typing import Callable, Optional
 import pandas as pd
@@ -12,6 +14,88 @@ from src.data_source_interface import NoDataFoundError, LoginError, DataSourceEr
 logger = logging.getLogger(__name__)
 
 
+# 异常类型 -> (日志级别, 返回给客户端的错误消息模板)。按异常类的 MRO 查找，
+# 因此子类（NoDataFoundError、LoginError）优先于父类 DataSourceError
+_ERROR_RESPONSES = {
+    NoDataFoundError: (logging.WARNING, "错误: {e}"),
+    LoginError: (logging.ERROR, "错误: 无法连接到数据源。{e}"),
+    DataSourceError: (logging.ERROR, "错误: 获取数据时发生错误。{e}"),
+    ValueError: (logging.WARNING, "错误: 无效的输入参数。{e}"),
+}
+
+
+def _handle_tool_errors(func: Callable[..., str]) -> Callable[..., str]:
+    """
+    把工具辅助函数抛出的异常转换为返回给客户端的错误消息。
+
+    已知异常按 _ERROR_RESPONSES 记录日志并返回对应消息；其余异常记录完整堆栈后
+    返回通用错误消息。被装饰函数的第一个参数必须是工具名称，用于日志记录。
+    """
+    @functools.wraps(func)
+    def wrapper(tool_name: str, *args, **kwargs) -> str:
+        try:
+            return func(tool_name, *args, **kwargs)
+        except Exception as e:
+            return tool_error_response(tool_name, e)
+
+    return wrapper
+
+
+def tool_error_response(tool_name: str, e: Exception) -> str:
+    """
+    记录工具执行中捕获的异常，并返回给客户端的错误消息。
+
+    已知异常（如非交易日的 NoDataFoundError）是预期内的，按 _ERROR_RESPONSES
+    只记录一行日志，不格式化堆栈；其余异常记录完整堆栈后返回通用错误消息。
+
+    Args:
+        tool_name (str): 工具名称，用于日志记录。
+        e (Exception): 捕获的异常。
+
+    Returns:
+        str: 错误消息。
+    """
+    for cls in type(e).__mro__:
+        response = _ERROR_RESPONSES.get(cls)
+        if response is not None:
+            level, template = response
+            logger.log(level, "工具 '%s' 出错 (%s): %s", tool_name, cls.__name__, e)
+            return template.format(e=e)
+    logger.exception("处理 %s 时发生意外异常: %s", tool_name, e)
+    return f"错误: 发生意外错误: {e}"
+
+
+def is_valid_year(year: str) -> bool:
+    """
+    判断 year 是否为 1900-2099 之间的4位数字年份。
+
+    isdigit 还会接受 '²' 等上标字符、isdecimal 会接受全角数字，这里只允许 ASCII 数字。
+    四位数字字符串按字典序比较即按数值比较，不需要转换为 int。
+    """
+    return len(year) == 4 and year.isascii() and year.isdecimal() and "1900" <= year <= "2099"
+
+
+def validate_report_period(year: str, quarter: int) -> Optional[str]:
+    """
+    校验财务报告期参数。
+
+    Args:
+        year (str): 查询年份。
+        quarter (int): 查询季度。
+
+    Returns:
+        Optional[str]: 参数无效时返回错误消息，有效时返回 None。
+    """
+    if not is_valid_year(year):
+        logger.warning("请求了无效的年份格式: %s", year)
+        return f"错误: 无效的年份 '{year}'。请输入4位数字的年份。"
+    if not 1 <= quarter <= 4:
+        logger.warning("请求了无效的季度: %s", quarter)
+        return f"错误: 无效的季度 '{quarter}'。必须在 1 到 4 之间。"
+    return None
+
+
+@_handle_tool_errors
 def call_financial_data_tool(
     tool_name: str,
     data_source_method: Callable,
@@ -34,44 +118,24 @@ def call_financial_data_tool(
         year (str): 查询年份。
         quarter (int): 查询季度。
         limit (int, optional): 返回的最大行数。默认为 250。
-        format (str, optional): 输出格式 ('markdown', 'json', 'csv')。默认为 "markdown"。
+        format (str, optional): 输出格式 ('markdown', 'json', 'csv', 'arrow', 'parquet')。默认为 "markdown"。
 
     Returns:
         str: 带有结果或错误消息的格式化字符串。
     """
-    logger.info(f"工具 '{tool_name}' 已为 {code}, {year}Q{quarter} 调用")
-    try:
-        if not year.isdigit() or len(year) != 4:
-            logger.warning(f"请求了无效的年份格式: {year}")
-            return f"错误: 无效的年份 '{year}'。请输入4位数字的年份。"
-        if not 1 <= quarter <= 4:
-            logger.warning(f"请求了无效的季度: {quarter}")
-            return f"错误: 无效的季度 '{quarter}'。必须在 1 到 4 之间。"
-
-        df = data_source_method(code=code, year=year, quarter=quarter)
-        logger.info(
-            f"已成功检索 {data_type_name} 数据，代码 {code}, {year}Q{quarter}。")
-        meta = {"code": code, "year": year, "quarter": quarter, "dataset": data_type_name}
-        return format_table_output(df, format=format, max_rows=limit, meta=meta)
-
-    except NoDataFoundError as e:
-        logger.warning(f"未找到数据错误 for {code}, {year}Q{quarter}: {e}")
-        return f"错误: {e}"
-    except LoginError as e:
-        logger.error(f"登录错误 for {code}: {e}")
-        return f"错误: 无法连接到数据源。{e}"
-    except DataSourceError as e:
-        logger.error(f"数据源错误 for {code}: {e}")
-        return f"错误: 获取数据时发生错误。{e}"
-    except ValueError as e:
-        logger.warning(f"值错误处理请求 for {code}: {e}")
-        return f"错误: 无效的输入参数。{e}"
-    except Exception as e:
-        logger.exception(
-            f"处理 {tool_name} for {code} 时发生意外异常: {e}")
-        return f"错误: 发生意外错误: {e}"
+    logger.info("工具 '%s' 已为 %s, %sQ%s 调用", tool_name, code, year, quarter)
+    error = validate_report_period(year, quarter)
+    if error:
+        return error
+
+    df = data_source_method(code=code, year=year, quarter=quarter)
+    logger.info(
+        "已成功检索 %s 数据，代码 %s, %sQ%s。", data_type_name, code, year, quarter)
+    meta = {"code": code, "year": year, "quarter": quarter, "dataset": data_type_name}
+    return format_table_output(df, format=format, max_rows=limit, meta=meta)
 
 
+@_handle_tool_errors
 def call_macro_data_tool(
     tool_name: str,
     data_source_method: Callable,
@@ -93,37 +157,23 @@ def call_macro_data_tool(
         start_date (Optional[str], optional): 开始日期。
         end_date (Optional[str], optional): 结束日期。
         limit (int, optional): 返回的最大行数。默认为 250。
-        format (str, optional): 输出格式 ('markdown', 'json', 'csv')。默认为 "markdown"。
+        format (str, optional): 输出格式 ('markdown', 'json', 'csv', 'arrow', 'parquet')。默认为 "markdown"。
         **kwargs: 传递给 data_source_method 的其他关键字参数。
 
     Returns:
         str: 带有结果或错误消息的格式化字符串。
     """
-    date_range_log = f"从 {start_date or '默认'} 到 {end_date or '默认'}"
-    kwargs_log = f", 额外参数={kwargs}" if kwargs else ""
-    logger.info(f"工具 '{tool_name}' 已调用 {date_range_log}{kwargs_log}")
-    try:
-        df = data_source_method(start_date=start_date, end_date=end_date, **kwargs)
-        logger.info(f"已成功检索 {data_type_name} 数据。")
-        meta = {"dataset": data_type_name, "start_date": start_date, "end_date": end_date} | ({"extra": kwargs} if kwargs else {})
-        return format_table_output(df, format=format, max_rows=limit, meta=meta)
-    except NoDataFoundError as e:
-        logger.warning(f"未找到数据错误: {e}")
-        return f"错误: {e}"
-    except LoginError as e:
-        logger.error(f"登录错误: {e}")
-        return f"错误: 无法连接到数据源。{e}"
-    except DataSourceError as e:
-        logger.error(f"数据源错误: {e}")
-        return f"错误: 获取数据时发生错误。{e}"
-    except ValueError as e:
-        logger.warning(f"值错误: {e}")
-        return f"错误: 无效的输入参数。{e}"
-    except Exception as e:
-        logger.exception(f"处理 {tool_name} 时发生意外异常: {e}")
-        return f"错误: 发生意外错误: {e}"
+    if logger.isEnabledFor(logging.INFO):
+        kwargs_log = f", 额外参数={kwargs}" if kwargs else ""
+        logger.info("工具 '%s' 已调用 从 %s 到 %s%s",
+                    tool_name, start_date or "默认", end_date or "默认", kwargs_log)
+    df = data_source_method(start_date=start_date, end_date=end_date, **kwargs)
+    logger.info("已成功检索 %s 数据。", data_type_name)
+    meta = {"dataset": data_type_name, "start_date": start_date, "end_date": end_date} | ({"extra": kwargs} if kwargs else {})
+    return format_table_output(df, format=format, max_rows=limit, meta=meta)
 
 
+@_handle_tool_errors
 def call_index_constituent_tool(
     tool_name: str,
     data_source_method: Callable,
@@ -142,31 +192,34 @@ def call_index_constituent_tool(
         index_name (str): 指数名称（用于日志记录）。
         date (Optional[str], optional): 查询日期。
         limit (int, optional): 返回的最大行数。默认为 250。
-        format (str, optional): 输出格式 ('markdown', 'json', 'csv')。默认为 "markdown"。
+        format (str, optional): 输出格式 ('markdown', 'json', 'csv', 'arrow', 'parquet')。默认为 "markdown"。
 
     Returns:
         str: 带有结果或错误消息的格式化字符串。
     """
-    log_msg = f"工具 '{tool_name}' 已为日期={date or '最新'} 调用"
-    logger.info(log_msg)
-    try:
-        df = data_source_method(date=date)
-        logger.info(
-            f"已成功检索 {index_name} 成分股，日期为 {date or '最新'}。")
-        meta = {"index": index_name, "as_of": date or "latest"}
-        return format_table_output(df, format=format, max_rows=limit, meta=meta)
-    except NoDataFoundError as e:
-        logger.warning(f"未找到数据错误: {e}")
-        return f"错误: {e}"
-    except LoginError as e:
-        logger.error(f"登录错误: {e}")
-        return f"错误: 无法连接到数据源。{e}"
-    except DataSourceError as e:
-        logger.error(f"数据源错误: {e}")
-        return f"错误: 获取数据时发生错误。{e}"
-    except ValueError as e:
-        logger.warning(f"值错误: {e}")
-        return f"错误: 无效的输入参数。{e}"
-    except Exception as e:
-        logger.exception(f"处理 {tool_name} 时发生意外异常: {e}")
-        return f"错误: 发生意外错误: {e}"
+    as_of = date or "latest"
+    logger.info("工具 '%s' 已为日期=%s 调用", tool_name, as_of)
+    df = data_source_method(date=date)
+    logger.info("已成功检索 %s 成分股，日期为 %s。", index_name, as_of)
+    meta = {"index": index_name, "as_of": as_of}
+    return format_table_output(df, format=format, max_rows=limit, meta=meta)
+
+
+# --- 协程版本 ---
+# 在工作线程中执行上面的同步辅助函数（含数据源调用与格式化），不阻塞事件循环，
+# 返回值与异常处理与同步版本完全一致。MCP 服务器已把同步工具放到工作线程执行，
+# 这些协程供在事件循环中直接组合多个调用（例如 asyncio.gather）的代码使用。
+
+async def acall_financial_data_tool(*args, **kwargs) -> str:
+    """call_financial_data_tool 的协程版本，参数相同。"""
+    return await asyncio.to_thread(functools.partial(call_financial_data_tool, *args, **kwargs))
+
+
+async def acall_macro_data_tool(*args, **kwargs) -> str:
+    """call_macro_data_tool 的协程版本，参数相同。"""
+    return await asyncio.to_thread(functools.partial(call_macro_data_tool, *args, **kwargs))
+
+
+async def acall_index_constituent_tool(*args, **kwargs) -> str:
+    """call_index_constituent_tool 的协程版本，参数相同。"""
+    return await asyncio.to_thread(functools.partial(call_index_constituent_tool, *args, **kwargs))
@@ -5,13 +5,148 @@ MCP 服务器的日期实用工具。
 import logging
 from datetime import datetime, timedelta
 import calendar
+from functools import lru_cache
+from typing import Dict, List
+
+from dateutil.relativedelta import relativedelta
 
 from mcp.server.fastmcp import FastMCP
-from src.data_source_interface import FinancialDataSource
+from src.data_source_interface import DataSourceError, FinancialDataSource, NoDataFoundError
 
 logger = logging.getLogger(__name__)
 
 
+def _trade_calendar(active_data_source: FinancialDataSource, start_date: str, end_date: str):
+    """
+    返回 [start_date, end_date] 区间内的交易日历。
+
+    实际逐年查询整年的日历再截取，使窗口各不相同的日期工具共享数据源中每年一条的缓存，
+    而不是每个窗口各查一次。尚未发布日历的年份（如年末查询跨入的下一年）按空日历跳过。
+
+    Args:
+        active_data_source (FinancialDataSource): 金融数据源。
+        start_date (str): 'YYYY-MM-DD' 格式的开始日期。
+        end_date (str): 'YYYY-MM-DD' 格式的结束日期。
+
+    Returns:
+        pd.DataFrame: 含 calendar_date、is_trading_day 列的交易日历。
+
+    Raises:
+        ValueError: 如果日期格式无效。
+        NoDataFoundError: 如果区间涉及的所有年份都没有日历数据。
+    """
+    datetime.strptime(start_date, "%Y-%m-%d")
+    datetime.strptime(end_date, "%Y-%m-%d")
+    frames = []
+    missing = None
+    for year in range(int(start_date[:4]), int(end_date[:4]) + 1):
+        try:
+            frames.append(
+                active_data_source.get_trade_dates(start_date=f"{year}-01-01", end_date=f"{year}-12-31"))
+        except NoDataFoundError as e:
+            logger.debug("%d 年没有交易日历，跳过: %s", year, e)
+            missing = e
+    if not frames:
+        raise missing
+    if len(frames) == 1:
+        df = frames[0]
+    else:
+        # 延迟导入 pandas，避免拖慢服务启动
+        import pandas as pd
+        df = pd.concat(frames, ignore_index=True)
+    day_col = 'calendar_date' if 'calendar_date' in df.columns else df.columns[0]
+    return df[(df[day_col] >= start_date) & (df[day_col] <= end_date)]
+
+
+def _trading_days_array(df):
+    """
+    从交易日历中取出交易日的 numpy 数组（按日期升序，Baostock 原样返回的顺序）。
+
+    直接在数组上二分查找，避免布尔掩码 DataFrame 和 sort_values 的开销。
+    """
+    flag_col = 'is_trading_day' if 'is_trading_day' in df.columns else df.columns[-1]
+    day_col = 'calendar_date' if 'calendar_date' in df.columns else df.columns[0]
+    days = df[day_col].to_numpy()
+    return days[df[flag_col].to_numpy() == '1']
+
+
+def bulk_classify_trading_days(active_data_source: FinancialDataSource, dates: List[str]) -> Dict[str, bool]:
+    """
+    判断一批日期是否为交易日。
+
+    只查询一次覆盖全部日期的交易日历（最早到最晚日期），再逐个查表，
+    而不是为每个日期单独发起查询；交易日历本身由数据源缓存。
+
+    Args:
+        active_data_source (FinancialDataSource): 金融数据源。
+        dates (List[str]): 'YYYY-MM-DD' 格式的日期列表。
+
+    Returns:
+        Dict[str, bool]: 日期到是否为交易日的映射，顺序与 dates 一致（重复日期只保留一次）；
+            不在交易日历中的日期视为非交易日。
+
+    Raises:
+        ValueError: 如果日期格式无效。
+    """
+    if not dates:
+        return {}
+    for date in dates:
+        datetime.strptime(date, "%Y-%m-%d")
+    try:
+        df = _trade_calendar(active_data_source, min(dates), max(dates))
+    except NoDataFoundError:
+        return {date: False for date in dates}
+    trading_days = set(df.loc[df['is_trading_day'] == '1', 'calendar_date'])
+    return {date: date in trading_days for date in dates}
+
+
+# 分析周期 -> (起始月份相对当月的回溯月数, 区间中点相对起始月份的月数)；
+# 中点用于生成 "X月-Y月-Z月" 形式的描述，未知周期按最近 1 个月处理
+_TIMEFRAME_MONTHS = {
+    "recent": (1, 0),
+    "quarter": (3, 0),
+    "half_year": (6, 3),
+    "year": (12, 6),
+}
+
+
+@lru_cache(maxsize=32)
+def _compute_timeframe(period: str, today_iso: str) -> str:
+    """
+    计算 get_market_analysis_timeframe 的结果。
+
+    结果只取决于周期和当天日期，按 (period, today_iso) 缓存，同一天内的重复调用直接返回。
+    """
+    now = datetime.strptime(today_iso, "%Y-%m-%d")
+    end_date = now
+
+    months_back, middle_offset = _TIMEFRAME_MONTHS.get(period, (1, 0))
+    if period == "recent" and now.day < 15:
+        # 上半月时当月数据太少，多回溯一个月
+        months_back, middle_offset = 2, 1
+    start_date = now.replace(day=1) - relativedelta(months=months_back)
+    middle_date = start_date + relativedelta(months=middle_offset)
+
+    def get_month_end_day(year, month):
+        return calendar.monthrange(year, month)[1]
+
+    end_day = min(get_month_end_day(end_date.year, end_date.month), end_date.day)
+    end_iso_date = f"{end_date.year}-{end_date.month:02d}-{end_day:02d}"
+
+    start_iso_date = f"{start_date.year}-{start_date.month:02d}-01"
+
+    if start_date.year != end_date.year:
+        date_range = f"{start_date.year}年{start_date.month}月-{end_date.year}年{end_date.month}月"
+    elif middle_date.month != start_date.month and middle_date.month != end_date.month:
+        date_range = f"{start_date.year}年{start_date.month}月-{middle_date.month}月-{end_date.month}月"
+    elif start_date.month != end_date.month:
+        date_range = f"{start_date.year}年{start_date.month}月-{end_date.month}月"
+    else:
+        date_range = f"{start_date.year}年{start_date.month}月"
+
+    return f"{date_range} (ISO: {start_iso_date} to {end_iso_date})"
+
+
 def register_date_utils_tools(app: FastMCP, active_data_source: FinancialDataSource):
     """
     向 MCP 应用注册日期实用工具。
@@ -31,20 +166,17 @@ def register_date_utils_tools(app: FastMCP, active_data_source: FinancialDataSou
         """
         logger.info("工具 'get_latest_trading_date' 已调用")
         try:
-            today = datetime.now().strftime("%Y-%m-%d")
-            # 查询当月（安全边界）
-            start_date = (datetime.now().replace(day=1)).strftime("%Y-%m-%d")
-            end_date = (datetime.now().replace(day=28)).strftime("%Y-%m-%d")
+            now = datetime.now()
+            today = now.strftime("%Y-%m-%d")
+            # 查询最近 30 天（覆盖长假），数据来自按年缓存的交易日历
+            start_date = (now - timedelta(days=30)).strftime("%Y-%m-%d")
 
-            df = active_data_source.get_trade_dates(
-                start_date=start_date, end_date=end_date)
+            df = _trade_calendar(active_data_source, start_date, today)
 
-            valid_trading_days = df[df['is_trading_day'] == '1']['calendar_date'].tolist()
-
-            latest_trading_date = None
-            for dstr in valid_trading_days:
-                if dstr <= today and (latest_trading_date is None or dstr > latest_trading_date):
-                    latest_trading_date = dstr
+            # Baostock 按日期升序返回交易日历，二分查找最后一个不晚于今天的交易日
+            valid_trading_days = df.loc[df['is_trading_day'] == '1', 'calendar_date']
+            idx = valid_trading_days.searchsorted(today, side="right")
+            latest_trading_date = valid_trading_days.iloc[idx - 1] if idx else None
 
             if latest_trading_date:
                 logger.info("找到最新交易日: %s", latest_trading_date)
@@ -53,6 +185,9 @@ def register_date_utils_tools(app: FastMCP, active_data_source: FinancialDataSou
                 logger.warning("今天之前未找到交易日，返回今天日期")
                 return today
 
+        except DataSourceError as e:
+            logger.warning("确定最新交易日时出错: %s", e)
+            return datetime.now().strftime("%Y-%m-%d")
         except Exception as e:
             logger.exception("确定最新交易日时出错: %s", e)
             return datetime.now().strftime("%Y-%m-%d")
@@ -69,75 +204,10 @@ def register_date_utils_tools(app: FastMCP, active_data_source: FinancialDataSou
             str: 一个易于理解的标签加上ISO范围，例如 "2025年1月-3月 (ISO: 2025-01-01 至 2025-03-31)"。
         """
         logger.info(
-            f"工具 'get_market_analysis_timeframe' 已调用，周期={period}")
-
-        now = datetime.now()
-        end_date = now
-
-        if period == "recent":
-            if now.day < 15:
-                if now.month == 1:
-                    start_date = datetime(now.year - 1, 11, 1)
-                    middle_date = datetime(now.year - 1, 12, 1)
-                elif now.month == 2:
-                    start_date = datetime(now.year, 1, 1)
-                    middle_date = start_date
-                else:
-                    start_date = datetime(now.year, now.month - 2, 1)
-                    middle_date = datetime(now.year, now.month - 1, 1)
-            else:
-                if now.month == 1:
-                    start_date = datetime(now.year - 1, 12, 1)
-                    middle_date = start_date
-                else:
-                    start_date = datetime(now.year, now.month - 1, 1)
-                    middle_date = start_date
-
-        elif period == "quarter":
-            if now.month <= 3:
-                start_date = datetime(now.year - 1, now.month + 9, 1)
-            else:
-                start_date = datetime(now.year, now.month - 3, 1)
-            middle_date = start_date
-
-        elif period == "half_year":
-            if now.month <= 6:
-                start_date = datetime(now.year - 1, now.month + 6, 1)
-            else:
-                start_date = datetime(now.year, now.month - 6, 1)
-            middle_date = datetime(start_date.year, start_date.month + 3, 1) if start_date.month <= 9 else \
-                datetime(start_date.year + 1, start_date.month - 9, 1)
-
-        elif period == "year":
-            start_date = datetime(now.year - 1, now.month, 1)
-            middle_date = datetime(start_date.year, start_date.month + 6, 1) if start_date.month <= 6 else \
-                datetime(start_date.year + 1, start_date.month - 6, 1)
-        else:
-            if now.month == 1:
-                start_date = datetime(now.year - 1, 12, 1)
-            else:
-                start_date = datetime(now.year, now.month - 1, 1)
-            middle_date = start_date
-
-        def get_month_end_day(year, month):
-            return calendar.monthrange(year, month)[1]
+            "工具 'get_market_analysis_timeframe' 已调用，周期=%s", period)
 
-        end_day = min(get_month_end_day(end_date.year, end_date.month), end_date.day)
-        end_iso_date = f"{end_date.year}-{end_date.month:02d}-{end_day:02d}"
-
-        start_iso_date = f"{start_date.year}-{start_date.month:02d}-01"
-
-        if start_date.year != end_date.year:
-            date_range = f"{start_date.year}年{start_date.month}月-{end_date.year}年{end_date.month}月"
-        elif middle_date.month != start_date.month and middle_date.month != end_date.month:
-            date_range = f"{start_date.year}年{start_date.month}月-{middle_date.month}月-{end_date.month}月"
-        elif start_date.month != end_date.month:
-            date_range = f"{start_date.year}年{start_date.month}月-{end_date.month}月"
-        else:
-            date_range = f"{start_date.year}年{start_date.month}月"
-
-        result = f"{date_range} (ISO: {start_iso_date} to {end_iso_date})"
-        logger.info(f"生成的市场分析时间范围: {result}")
+        result = _compute_timeframe(period, datetime.now().strftime("%Y-%m-%d"))
+        logger.info("生成的市场分析时间范围: %s", result)
         return result
 
     @app.tool()
@@ -156,16 +226,49 @@ def register_date_utils_tools(app: FastMCP, active_data_source: FinancialDataSou
         """
         logger.info("工具 'is_trading_day' 已调用 date=%s", date)
         try:
-            df = active_data_source.get_trade_dates(start_date=date, end_date=date)
+            df = _trade_calendar(active_data_source, date, date)
             if df is None or df.empty:
                 return "否"
             flag_col = 'is_trading_day' if 'is_trading_day' in df.columns else df.columns[-1]
-            val = str(df.iloc[0][flag_col])
+            val = str(df[flag_col].iat[0])
             return "是" if val == '1' else "否"
+        except NoDataFoundError:
+            # 尚未发布日历的日期（如远期日期）不是已知的交易日
+            return "否"
+        except (DataSourceError, ValueError) as e:
+            # 数据源错误和无效日期是预期内的错误，不记录堆栈
+            logger.warning("处理 is_trading_day 时出错: %s", e)
+            return f"错误: {e}"
         except Exception as e:
             logger.exception("处理 is_trading_day 时发生异常: %s", e)
             return f"错误: {e}"
 
+    @app.tool()
+    def classify_trading_days(dates: List[str]) -> str:
+        """
+        一次判断多个日期是否为交易日。
+
+        Args:
+            dates (List[str]): 'YYYY-MM-DD' 格式的日期列表。
+
+        Returns:
+            str: 每行一个 '日期: 是/否'。
+
+        Examples:
+            - classify_trading_days(['2025-01-01', '2025-01-02'])
+        """
+        logger.info("工具 'classify_trading_days' 已调用，共 %d 个日期", len(dates))
+        try:
+            result = bulk_classify_trading_days(active_data_source, dates)
+            return "\n".join(f"{date}: {'是' if flag else '否'}" for date, flag in result.items())
+        except (DataSourceError, ValueError) as e:
+            # 数据源错误和无效日期是预期内的错误，不记录堆栈
+            logger.warning("处理 classify_trading_days 时出错: %s", e)
+            return f"错误: {e}"
+        except Exception as e:
+            logger.exception("处理 classify_trading_days 时发生异常: %s", e)
+            return f"错误: {e}"
+
     @app.tool()
     def previous_trading_day(date: str) -> str:
         """
@@ -182,15 +285,16 @@ def register_date_utils_tools(app: FastMCP, active_data_source: FinancialDataSou
             d = datetime.strptime(date, "%Y-%m-%d")
             start = (d - timedelta(days=30)).strftime("%Y-%m-%d")
             end = date
-            df = active_data_source.get_trade_dates(start_date=start, end_date=end)
+            df = _trade_calendar(active_data_source, start, end)
             if df is None or df.empty:
                 return date
-            flag_col = 'is_trading_day' if 'is_trading_day' in df.columns else df.columns[-1]
-            day_col = 'calendar_date' if 'calendar_date' in df.columns else df.columns[0]
-            candidates = df[(df[flag_col] == '1') & (df[day_col] < date)].sort_values(by=day_col)
-            if candidates.empty:
-                return date
-            return str(candidates.iloc[-1][day_col])
+            trading_days = _trading_days_array(df)
+            idx = trading_days.searchsorted(date, side="left")
+            return str(trading_days[idx - 1]) if idx else date
+        except (DataSourceError, ValueError) as e:
+            # 数据源错误和无效日期是预期内的错误，不记录堆栈
+            logger.warning("处理 previous_trading_day 时出错: %s", e)
+            return f"错误: {e}"
         except Exception as e:
             logger.exception("处理 previous_trading_day 时发生异常: %s", e)
             return f"错误: {e}"
@@ -211,15 +315,16 @@ def register_date_utils_tools(app: FastMCP, active_data_source: FinancialDataSou
             d = datetime.strptime(date, "%Y-%m-%d")
             start = date
             end = (d + timedelta(days=30)).strftime("%Y-%m-%d")
-            df = active_data_source.get_trade_dates(start_date=start, end_date=end)
+            df = _trade_calendar(active_data_source, start, end)
             if df is None or df.empty:
                 return date
-            flag_col = 'is_trading_day' if 'is_trading_day' in df.columns else df.columns[-1]
-            day_col = 'calendar_date' if 'calendar_date' in df.columns else df.columns[0]
-            candidates = df[(df[flag_col] == '1') & (df[day_col] > date)].sort_values(by=day_col)
-            if candidates.empty:
-                return date
-            return str(candidates.iloc[0][day_col])
+            trading_days = _trading_days_array(df)
+            idx = trading_days.searchsorted(date, side="right")
+            return str(trading_days[idx]) if idx < len(trading_days) else date
+        except (DataSourceError, ValueError) as e:
+            # 数据源错误和无效日期是预期内的错误，不记录堆栈
+            logger.warning("处理 next_trading_day 时出错: %s", e)
+            return f"错误: {e}"
         except Exception as e:
             logger.exception("处理 next_trading_day 时发生异常: %s", e)
             return f"错误: {e}"
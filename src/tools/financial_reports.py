@@ -7,47 +7,34 @@ from typing import List, Optional
 
 from mcp.server.fastmcp import FastMCP
 from src.data_source_interface import FinancialDataSource
-from src.tools.base import call_financial_data_tool
+from src.formatting.markdown_formatter import format_table_output
+from src.tools.base import call_financial_data_tool, tool_error_response, validate_report_period
 
 logger = logging.getLogger(__name__)
 
-
-def register_financial_report_tools(app: FastMCP, active_data_source: FinancialDataSource):
-    """
-    向 MCP 应用注册财务报告相关工具。
-
-    Args:
-        app (FastMCP): FastMCP 应用实例。
-        active_data_source (FinancialDataSource): 激活的金融数据源。
-    """
-
-    @app.tool()
-    def get_profit_data(code: str, year: str, quarter: int, limit: int = 250, format: str = "markdown") -> str:
-        """
-        获取股票的季度盈利能力数据（例如，净资产收益率，净利润率）。
-
-        Args:
-            code (str): 股票代码 (例如, 'sh.600000')。
-            year (str): 4位数字的年份 (例如, '2023')。
-            quarter (int): 季度 (1, 2, 3, 或 4)。
-            limit (int, optional): 返回的最大行数。默认为 250。
-            format (str, optional): 输出格式。默认为 'markdown'。
-
-        Returns:
-            str: 盈利能力指标表。
-        """
-        return call_financial_data_tool(
-            "get_profit_data",
-            active_data_source.get_profit_data,
-            "盈利能力",
-            code, year, quarter,
-            limit=limit, format=format
-        )
-
-    @app.tool()
-    def get_operation_data(code: str, year: str, quarter: int, limit: int = 250, format: str = "markdown") -> str:
-        """
-        获取股票的季度运营能力数据（例如，周转率）。
+# 数据集代号 -> (数据源方法名 / 单股工具名, 数据类型名称)
+FINANCIAL_DATASETS = {
+    "profit": ("get_profit_data", "盈利能力"),
+    "operation": ("get_operation_data", "运营能力"),
+    "growth": ("get_growth_data", "成长能力"),
+    "balance": ("get_balance_data", "资产负债"),
+    "cash_flow": ("get_cash_flow_data", "现金流量"),
+    "dupont": ("get_dupont_data", "杜邦分析"),
+}
+
+
+# 数据集代号 -> 单股工具说明的首句
+FINANCIAL_TOOL_SUMMARIES = {
+    "profit": "获取股票的季度盈利能力数据（例如，净资产收益率，净利润率）。",
+    "operation": "获取股票的季度运营能力数据（例如，周转率）。",
+    "growth": "获取股票的季度成长能力数据（例如，同比增长率）。",
+    "balance": "获取股票的季度资产负债/偿债能力数据（例如，流动比率，资产负债率）。",
+    "cash_flow": "获取股票的季度现金流量数据（例如，现金流量/营业收入比率）。",
+    "dupont": "获取股票的季度杜邦分析数据（净资产收益率分解）。",
+}
+
+_FINANCIAL_TOOL_DOC = """
+        {summary}
 
         Args:
             code (str): 股票代码 (例如, 'sh.600000')。
@@ -57,107 +44,100 @@ def register_financial_report_tools(app: FastMCP, active_data_source: FinancialD
             format (str, optional): 输出格式。默认为 'markdown'。
 
         Returns:
-            str: 运营能力指标表。
+            str: {data_type_name}指标表。
         """
-        return call_financial_data_tool(
-            "get_operation_data",
-            active_data_source.get_operation_data,
-            "运营能力",
-            code, year, quarter,
-            limit=limit, format=format
-        )
 
-    @app.tool()
-    def get_growth_data(code: str, year: str, quarter: int, limit: int = 250, format: str = "markdown") -> str:
-        """
-        获取股票的季度成长能力数据（例如，同比增长率）。
 
-        Args:
-            code (str): 股票代码 (例如, 'sh.600000')。
-            year (str): 4位数字的年份 (例如, '2023')。
-            quarter (int): 季度 (1, 2, 3, 或 4)。
-            limit (int, optional): 返回的最大行数。默认为 250。
-            format (str, optional): 输出格式。默认为 'markdown'。
+def _make_financial_tool(
+    tool_name: str, active_data_source: FinancialDataSource, data_type_name: str, summary: str):
+    """
+    生成单股财务数据工具函数。
 
-        Returns:
-            str: 成长能力指标表。
-        """
+    工具名与数据源方法名相同。方法在调用时才从数据源上取出，注册工具不会触发
+    延迟数据源的构造；工具的名称、说明和参数签名与手写版本一致，FastMCP 据此生成工具的输入模式。
+    """
+    def tool(code: str, year: str, quarter: int, limit: int = 250, format: str = "markdown") -> str:
         return call_financial_data_tool(
-            "get_growth_data",
-            active_data_source.get_growth_data,
-            "成长能力",
+            tool_name, getattr(active_data_source, tool_name), data_type_name,
             code, year, quarter,
             limit=limit, format=format
         )
 
-    @app.tool()
-    def get_balance_data(code: str, year: str, quarter: int, limit: int = 250, format: str = "markdown") -> str:
-        """
-        获取股票的季度资产负债/偿债能力数据（例如，流动比率，资产负债率）。
+    tool.__name__ = tool.__qualname__ = tool_name
+    tool.__doc__ = _FINANCIAL_TOOL_DOC.format(summary=summary, data_type_name=data_type_name)
+    return tool
 
-        Args:
-            code (str): 股票代码 (例如, 'sh.600000')。
-            year (str): 4位数字的年份 (例如, '2023')。
-            quarter (int): 季度 (1, 2, 3, 或 4)。
-            limit (int, optional): 返回的最大行数。默认为 250。
-            format (str, optional): 输出格式。默认为 'markdown'。
-
-        Returns:
-            str: 资产负债指标表。
-        """
-        return call_financial_data_tool(
-            "get_balance_data",
-            active_data_source.get_balance_data,
-            "资产负债",
-            code, year, quarter,
-            limit=limit, format=format
-        )
 
-    @app.tool()
-    def get_cash_flow_data(code: str, year: str, quarter: int, limit: int = 250, format: str = "markdown") -> str:
-        """
-        获取股票的季度现金流量数据（例如，现金流量/营业收入比率）。
+def register_financial_report_tools(app: FastMCP, active_data_source: FinancialDataSource):
+    """
+    向 MCP 应用注册财务报告相关工具。
 
-        Args:
-            code (str): 股票代码 (例如, 'sh.600000')。
-            year (str): 4位数字的年份 (例如, '2023')。
-            quarter (int): 季度 (1, 2, 3, 或 4)。
-            limit (int, optional): 返回的最大行数。默认为 250。
-            format (str, optional): 输出格式。默认为 'markdown'。
+    Args:
+        app (FastMCP): FastMCP 应用实例。
+        active_data_source (FinancialDataSource): 激活的金融数据源。
+    """
 
-        Returns:
-            str: 现金流量指标表。
-        """
-        return call_financial_data_tool(
-            "get_cash_flow_data",
-            active_data_source.get_cash_flow_data,
-            "现金流量",
-            code, year, quarter,
-            limit=limit, format=format
-        )
+    for dataset, (method_name, data_type_name) in FINANCIAL_DATASETS.items():
+        app.tool()(_make_financial_tool(
+            method_name, active_data_source, data_type_name, FINANCIAL_TOOL_SUMMARIES[dataset]))
 
     @app.tool()
-    def get_dupont_data(code: str, year: str, quarter: int, limit: int = 250, format: str = "markdown") -> str:
+    def get_financial_data_batch(
+        codes: List[str],
+        year: str,
+        quarter: int,
+        dataset: str = "profit",
+        limit: int = 250,
+        format: str = "markdown",
+    ) -> str:
         """
-        获取股票的季度杜邦分析数据（净资产收益率分解）。
+        一次获取多只股票同一季度的同类财务数据，避免逐只调用单股工具。
 
         Args:
-            code (str): 股票代码 (例如, 'sh.600000')。
+            codes (List[str]): 股票代码列表 (例如, ['sh.600000', 'sz.000001'])。
             year (str): 4位数字的年份 (例如, '2023')。
             quarter (int): 季度 (1, 2, 3, 或 4)。
-            limit (int, optional): 返回的最大行数。默认为 250。
+            dataset (str, optional): 数据集，可选 'profit', 'operation', 'growth', 'balance',
+                'cash_flow', 'dupont'。默认为 'profit'。
+            limit (int, optional): 每只股票返回的最大行数。默认为 250。
             format (str, optional): 输出格式。默认为 'markdown'。
 
         Returns:
-            str: 杜邦分析指标表。
-        """
-        return call_financial_data_tool(
-            "get_dupont_data",
-            active_data_source.get_dupont_data,
-            "杜邦分析",
-            code, year, quarter,
-            limit=limit, format=format
-        )
+            str: 按代码分节（## 代码）的结果；单只股票出错只影响其所在小节。
+        """
+        if dataset not in FINANCIAL_DATASETS:
+            return f"错误: 无效的数据集 '{dataset}'。有效选项为: {list(FINANCIAL_DATASETS)}"
+        if not codes:
+            return "错误: 股票代码列表不能为空。"
+        # 报告期对所有代码相同，在循环外校验一次
+        error = validate_report_period(year, quarter)
+        if error:
+            return error
+        method_name, data_type_name = FINANCIAL_DATASETS[dataset]
+        method = getattr(active_data_source, method_name)
+
+        # 多只股票时先走数据源的批量接口（Baostock 在一次会话内依次查询）；
+        # 批量调用失败时回退为逐只调用，由单股路径给出各自的错误信息
+        frames = None
+        if len(codes) > 1:
+            try:
+                frames = active_data_source.get_financial_data_many(dataset, codes, year, quarter)
+            except Exception as e:
+                logger.warning("批量获取%s数据失败，改为逐只获取: %s", data_type_name, e)
+
+        sections = []
+        for code in codes:
+            if frames is None:
+                body = call_financial_data_tool(
+                    "get_financial_data_batch", method, data_type_name,
+                    code, year, quarter, limit=limit, format=format)
+            elif code in frames:
+                meta = {"code": code, "year": year, "quarter": quarter, "dataset": data_type_name}
+                body = format_table_output(frames[code], format=format, max_rows=limit, meta=meta)
+            else:
+                body = f"错误: 未找到代码 {code}，{year}年Q{quarter} 的 {data_type_name} 数据。"
+            sections.append(f"## {code}\n\n{body}")
+        return "\n\n".join(sections)
 
     @app.tool()
     def get_performance_express_report(code: str, start_date: str, end_date: str, limit: int = 250, format: str = "markdown") -> str:
@@ -176,20 +156,17 @@ def register_financial_report_tools(app: FastMCP, active_data_source: FinancialD
             str: 包含业绩快报数据的 Markdown 表格或错误消息。
         """
         logger.info(
-            f"工具 'get_performance_express_report' 已为 {code} 调用 ({start_date} 到 {end_date})")
+            "工具 'get_performance_express_report' 已为 %s 调用 (%s 到 %s)", code, start_date, end_date)
         try:
             df = active_data_source.get_performance_express_report(
                 code=code, start_date=start_date, end_date=end_date)
             logger.info(
-                f"已成功检索 {code} 的业绩快报。")
-            from src.formatting.markdown_formatter import format_table_output
+                "已成功检索 %s 的业绩快报。", code)
             meta = {"code": code, "start_date": start_date, "end_date": end_date, "dataset": "performance_express"}
             return format_table_output(df, format=format, max_rows=limit, meta=meta)
 
         except Exception as e:
-            logger.exception(
-                f"处理 get_performance_express_report for {code} 时发生异常: {e}")
-            return f"错误: 发生意外错误: {e}"
+            return tool_error_response("get_performance_express_report", e)
 
     @app.tool()
     def get_forecast_report(code: str, start_date: str, end_date: str, limit: int = 250, format: str = "markdown") -> str:
@@ -208,17 +185,14 @@ def register_financial_report_tools(app: FastMCP, active_data_source: FinancialD
             str: 包含业绩预告数据的 Markdown 表格或错误消息。
         """
         logger.info(
-            f"工具 'get_forecast_report' 已为 {code} 调用 ({start_date} 到 {end_date})")
+            "工具 'get_forecast_report' 已为 %s 调用 (%s 到 %s)", code, start_date, end_date)
         try:
             df = active_data_source.get_forecast_report(
                 code=code, start_date=start_date, end_date=end_date)
             logger.info(
-                f"已成功检索 {code} 的业绩预告。")
-            from src.formatting.markdown_formatter import format_table_output
+                "已成功检索 %s 的业绩预告。", code)
             meta = {"code": code, "start_date": start_date, "end_date": end_date, "dataset": "forecast"}
             return format_table_output(df, format=format, max_rows=limit, meta=meta)
 
         except Exception as e:
-            logger.exception(
-                f"处理 get_forecast_report for {code} 时发生异常: {e}")
-            return f"错误: 发生意外错误: {e}"
+            return tool_error_response("get_forecast_report", e)
@@ -3,15 +3,26 @@ MCP 服务器的指数相关工具。
 包括指数成分股和行业实用工具，参数清晰易发现。
 """
 import logging
-from typing import Optional, List
+from datetime import datetime
+from typing import Dict, Optional, List
+
+import pandas as pd
 
 from mcp.server.fastmcp import FastMCP
+from src.caching_data_source import DailyMemo
 from src.data_source_interface import FinancialDataSource
-from src.tools.base import call_index_constituent_tool
+from src.tools.base import call_index_constituent_tool, tool_error_response
 from src.formatting.markdown_formatter import format_table_output
 
 logger = logging.getLogger(__name__)
 
+# get_index_constituents 的指数代号 -> 数据源方法名
+INDEX_CONSTITUENT_METHODS = {
+    "hs300": "get_hs300_stocks",
+    "sz50": "get_sz50_stocks",
+    "zz500": "get_zz500_stocks",
+}
+
 
 def register_index_tools(app: FastMCP, active_data_source: FinancialDataSource):
     """
@@ -21,6 +32,40 @@ def register_index_tools(app: FastMCP, active_data_source: FinancialDataSource):
         app (FastMCP): FastMCP 应用实例。
         active_data_source (FinancialDataSource): 激活的金融数据源。
     """
+    # 日期 -> 行业名称 -> 成分股。list_industries 与 get_industry_members
+    # 共用一次全表查询和一次分组，之后按行业查找成分股是字典查找而不是整表过滤
+    industry_groups = DailyMemo()
+
+    def get_industry_groups(date: Optional[str]) -> Optional[Dict[str, pd.DataFrame]]:
+        """返回行业名称 -> 成分股 DataFrame 的映射，没有数据时返回 None。数据每日刷新。"""
+        now = datetime.now()
+        groups = industry_groups.get(date, now)
+        if groups is not None:
+            return groups
+        df = active_data_source.get_stock_industry(code=None, date=date)
+        if df is None or df.empty:
+            return None
+        col = "industry" if "industry" in df.columns else df.columns[-1]
+        groups = {name: group.reset_index(drop=True) for name, group in df.groupby(col, sort=False)}
+        industry_groups.put(date, groups, now)
+        return groups
+
+    def fetch_all_constituents(date: Optional[str]) -> pd.DataFrame:
+        """
+        获取全部主要指数的成分股，合并为一张表并在首列标明指数代号。
+
+        逐个调用单指数方法，使 'all' 与单指数请求共用 CachingDataSource 的每日缓存；
+        会话在查询间保持登录，批量接口不再能省下登录。Baostock 会话是进程级共享的单连接，
+        并发查询只会在会话锁上排队，因此不使用线程池。
+        """
+        keys = list(INDEX_CONSTITUENT_METHODS)
+        frames = {
+            key: getattr(active_data_source, method_name)(date=date)
+            for key, method_name in INDEX_CONSTITUENT_METHODS.items()
+        }
+        return pd.concat(
+            [frames[key].assign(index=key)[["index", *frames[key].columns]] for key in keys],
+            ignore_index=True)
 
     @app.tool()
     def get_stock_industry(code: Optional[str] = None, date: Optional[str] = None, limit: int = 250, format: str = "markdown") -> str:
@@ -36,19 +81,16 @@ def register_index_tools(app: FastMCP, active_data_source: FinancialDataSource):
         Returns:
             str: 包含行业数据的 Markdown 表格或错误消息。
         """
-        log_msg = f"工具 'get_stock_industry' 已为代码={code or '全部'}, 日期={date or '最新'} 调用"
-        logger.info(log_msg)
+        scope, as_of = code or "all", date or "latest"
+        logger.info("工具 'get_stock_industry' 已为代码=%s, 日期=%s 调用", scope, as_of)
         try:
             df = active_data_source.get_stock_industry(code=code, date=date)
-            logger.info(
-                f"已成功检索代码为 {code or '全部'}, 日期为 {date or '最新'} 的行业数据。")
-            meta = {"code": code or "all", "as_of": date or "latest"}
+            logger.info("已成功检索代码为 %s, 日期为 %s 的行业数据。", scope, as_of)
+            meta = {"code": scope, "as_of": as_of}
             return format_table_output(df, format=format, max_rows=limit, meta=meta)
 
         except Exception as e:
-            logger.exception(
-                f"处理 get_stock_industry 时发生异常: {e}")
-            return f"错误: 发生意外错误: {e}"
+            return tool_error_response("get_stock_industry", e)
 
     @app.tool()
     def get_sz50_stocks(date: Optional[str] = None, limit: int = 250, format: str = "markdown") -> str:
@@ -124,7 +166,8 @@ def register_index_tools(app: FastMCP, active_data_source: FinancialDataSource):
         获取主要指数的成分股。
 
         Args:
-            index (str): 'hs300' (沪深300), 'sz50' (上证50), 'zz500' (中证500) 之一。
+            index (str): 'hs300' (沪深300), 'sz50' (上证50), 'zz500' (中证500) 之一；
+                'all' 一次返回三个指数的成分股，并增加 index 列标明所属指数。
             date (Optional[str], optional): 可选的 'YYYY-MM-DD' 格式日期。如果为 None，则使用最新的可用日期。
             limit (int, optional): 返回的最大行数 (分页辅助)。默认为 250。
             format (str, optional): 输出格式: 'markdown' | 'json' | 'csv'。默认为 'markdown'。
@@ -135,29 +178,25 @@ def register_index_tools(app: FastMCP, active_data_source: FinancialDataSource):
         Examples:
             - get_index_constituents(index='hs300')
             - get_index_constituents(index='sz50', date='2024-12-31', format='json', limit=100)
+            - get_index_constituents(index='all', limit=1000)
         """
+        as_of = date or "latest"
         logger.info(
-            f"工具 'get_index_constituents' 已调用 index={index}, date={date or '最新'}, limit={limit}, format={format}")
+            "工具 'get_index_constituents' 已调用 index=%s, date=%s, limit=%s, format=%s", index, as_of, limit, format)
         try:
             key = (index or "").strip().lower()
-            if key not in {"hs300", "sz50", "zz500"}:
-                return "错误: 无效的指数。有效选项为 'hs300', 'sz50', 'zz500'。"
-
-            if key == "hs300":
-                df = active_data_source.get_hs300_stocks(date=date)
-            elif key == "sz50":
-                df = active_data_source.get_sz50_stocks(date=date)
+            if key == "all":
+                df = fetch_all_constituents(date)
             else:
-                df = active_data_source.get_zz500_stocks(date=date)
+                method_name = INDEX_CONSTITUENT_METHODS.get(key)
+                if method_name is None:
+                    return "错误: 无效的指数。有效选项为 'hs300', 'sz50', 'zz500', 'all'。"
+                df = getattr(active_data_source, method_name)(date=date)
 
-            meta = {
-                "index": key,
-                "as_of": date or "latest",
-            }
+            meta = {"index": key, "as_of": as_of}
             return format_table_output(df, format=format, max_rows=limit, meta=meta)
         except Exception as e:
-            logger.exception("处理 get_index_constituents 时发生异常: %s", e)
-            return f"错误: 发生意外错误: {e}"
+            return tool_error_response("get_index_constituents", e)
 
     @app.tool()
     def list_industries(date: Optional[str] = None, format: str = "markdown") -> str:
@@ -171,19 +210,17 @@ def register_index_tools(app: FastMCP, active_data_source: FinancialDataSource):
         Returns:
             str: 单列的行业表格。
         """
-        logger.info("工具 'list_industries' 已调用 date=%s", date or "最新")
+        as_of = date or "latest"
+        logger.info("工具 'list_industries' 已调用 date=%s", as_of)
         try:
-            df = active_data_source.get_stock_industry(code=None, date=date)
-            if df is None or df.empty:
+            groups = get_industry_groups(date)
+            if groups is None:
                 return "(无可用数据显示)"
-            col = "industry" if "industry" in df.columns else df.columns[-1]
-            out = df[[col]].drop_duplicates().sort_values(by=col)
-            out = out.rename(columns={col: "industry"})
-            meta = {"as_of": date or "latest", "count": int(out.shape[0])}
+            out = pd.DataFrame({"industry": sorted(groups)})
+            meta = {"as_of": as_of, "count": int(out.shape[0])}
             return format_table_output(out, format=format, max_rows=out.shape[0], meta=meta)
         except Exception as e:
-            logger.exception("处理 list_industries 时发生异常: %s", e)
-            return f"错误: 发生意外错误: {e}"
+            return tool_error_response("list_industries", e)
 
     @app.tool()
     def get_industry_members(
@@ -204,20 +241,22 @@ def register_index_tools(app: FastMCP, active_data_source: FinancialDataSource):
         Returns:
             str: 给定行业中的股票表格。
         """
+        as_of = date or "latest"
         logger.info(
             "工具 'get_industry_members' 已调用 industry=%s, date=%s, limit=%s, format=%s",
-            industry, date or "最新", limit, format,
+            industry, as_of, limit, format,
         )
         try:
             if not industry or not industry.strip():
                 return "错误: 'industry' 是必需的。调用 list_industries() 来发现可用的值。"
-            df = active_data_source.get_stock_industry(code=None, date=date)
-            if df is None or df.empty:
+            groups = get_industry_groups(date)
+            if groups is None:
                 return "(无可用数据显示)"
-            col = "industry" if "industry" in df.columns else df.columns[-1]
-            filtered = df[df[col] == industry].copy()
-            meta = {"industry": industry, "as_of": date or "latest"}
+            filtered = groups.get(industry)
+            if filtered is None:
+                # 保留列名，输出与整表过滤得到的空表一致
+                filtered = next(iter(groups.values())).iloc[:0]
+            meta = {"industry": industry, "as_of": as_of}
             return format_table_output(filtered, format=format, max_rows=limit, meta=meta)
         except Exception as e:
-            logger.exception("处理 get_industry_members 时发生异常: %s", e)
-            return f"错误: 发生意外错误: {e}"
+            return tool_error_response("get_industry_members", e)
@@ -81,7 +81,7 @@ def register_macroeconomic_tools(app: FastMCP, active_data_source: FinancialData
             str: 包含存款准备金率数据的 Markdown 表格或错误消息。
         """
         if year_type not in ['0', '1']:
-            logger.warning(f"请求了无效的年份类型: {year_type}")
+            logger.warning("请求了无效的年份类型: %s", year_type)
             return "错误: 无效的年份类型 '{year_type}'。有效选项为 '0' (公告日期) 或 '1' (生效日期)。"
 
         return call_macro_data_tool(
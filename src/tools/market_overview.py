@@ -3,14 +3,83 @@ MCP 服务器的市场概览工具。
 包括交易日历、股票列表和发现辅助工具。
 """
 import logging
+import re
+from datetime import datetime
 from typing import Optional
 
+import numpy as np
+import pandas as pd
+
 from mcp.server.fastmcp import FastMCP
+from src.caching_data_source import DailyMemo
 from src.data_source_interface import FinancialDataSource, NoDataFoundError, LoginError, DataSourceError
 from src.formatting.markdown_formatter import format_df_to_markdown, format_table_output
+from src.tools.base import tool_error_response
 
 logger = logging.getLogger(__name__)
 
+# Baostock 证券代码格式: 两位交易所前缀 + '.' + 6位数字 (例如, sh.600000)
+_CODE_FORMAT = re.compile(r"[a-z]{2}\.\d{6}")
+# 带交易所前缀的关键字只可能匹配代码开头，子串搜索等价于前缀搜索
+_EXCHANGE_PREFIX = re.compile(r"[a-z]{2}\.\d{0,6}")
+# 6位数字只可能匹配代码的整个数字部分，子串搜索等价于按数字部分精确查找
+_FULL_DIGITS = re.compile(r"\d{6}")
+
+
+class _StockSearchIndex:
+    """
+    search_stocks 和 get_suspensions 共用的股票列表索引。
+
+    代码只小写化一次；关键字为 'sh.6' 这类交易所前缀或完整6位数字时，
+    在排好序的代码数组上用 searchsorted 做区间查找 (O(log N))，其余关键字
+    对定长字符串数组做一次 np.char.find 扫描（代码均为 ASCII 时扫描单字节数组）。
+    两种路径的结果与逐行子串匹配相同，并保持原始行顺序。
+    tradeStatus 另存为分类类型（只有 '0'/'1' 两个取值），按状态筛选时
+    比较的是 int8 编码而不是逐个比较字符串；返回的 df 本身保持原样。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._status = (
+            df["tradeStatus"].astype("category") if "tradeStatus" in df.columns else None)
+        self._codes = df["code"].fillna("").str.lower().to_numpy(dtype=str)
+        # 单字节数组只有 UCS-4 数组的四分之一大小，扫描更快
+        self._code_bytes = (
+            self._codes.astype("S") if all(code.isascii() for code in self._codes) else None)
+        self._sorted = None
+        # 只有全部代码都符合标准格式时，前缀/精确查找才与子串匹配等价
+        if all(_CODE_FORMAT.fullmatch(code) for code in self._codes):
+            order = np.argsort(self._codes, kind="stable")
+            digits = np.array([code[3:] for code in self._codes])
+            digit_order = np.argsort(digits, kind="stable")
+            self._sorted = (self._codes[order], order, digits[digit_order], digit_order)
+
+    def find(self, keyword: str) -> np.ndarray:
+        """返回代码中包含 keyword（已小写）的行位置，按原始顺序排列。"""
+        if self._sorted is not None:
+            codes_sorted, order, digits_sorted, digit_order = self._sorted
+            if _EXCHANGE_PREFIX.fullmatch(keyword):
+                lo = np.searchsorted(codes_sorted, keyword, side="left")
+                hi = np.searchsorted(codes_sorted, keyword + "\uffff", side="left")
+                return np.sort(order[lo:hi])
+            if _FULL_DIGITS.fullmatch(keyword):
+                lo = np.searchsorted(digits_sorted, keyword, side="left")
+                hi = np.searchsorted(digits_sorted, keyword, side="right")
+                return np.sort(digit_order[lo:hi])
+        if self._code_bytes is not None:
+            # 非 ASCII 关键字不可能是 ASCII 代码的子串
+            if not keyword.isascii():
+                return np.empty(0, dtype=np.intp)
+            return np.flatnonzero(np.char.find(self._code_bytes, keyword.encode("ascii")) >= 0)
+        return np.flatnonzero(np.char.find(self._codes, keyword) >= 0)
+
+    def status_positions(self, status: str) -> np.ndarray:
+        """返回 tradeStatus 等于 status 的行位置，按原始顺序排列。"""
+        categories = self._status.cat.categories
+        if status not in categories:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(self._status.cat.codes.to_numpy() == categories.get_loc(status))
+
 
 def register_market_overview_tools(app: FastMCP, active_data_source: FinancialDataSource):
     """
@@ -20,6 +89,21 @@ def register_market_overview_tools(app: FastMCP, active_data_source: FinancialDa
         app (FastMCP): FastMCP 应用实例。
         active_data_source (FinancialDataSource): 激活的金融数据源。
     """
+    # 日期 -> 股票列表索引，数据每日刷新
+    stock_indexes = DailyMemo()
+
+    def get_stock_index(date: Optional[str]) -> Optional[_StockSearchIndex]:
+        """返回指定日期股票列表的搜索索引，没有数据时返回 None。"""
+        now = datetime.now()
+        index = stock_indexes.get(date, now)
+        if index is not None:
+            return index
+        df = active_data_source.get_all_stock(date=date)
+        if df is None or df.empty:
+            return None
+        index = _StockSearchIndex(df)
+        stock_indexes.put(date, index, now)
+        return index
 
     @app.tool()
     def get_trade_dates(start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 250, format: str = "markdown") -> str:
@@ -35,30 +119,30 @@ def register_market_overview_tools(app: FastMCP, active_data_source: FinancialDa
         Returns:
             str: 包含 'is_trading_day' (1=交易日, 0=非交易日) 的 Markdown 表格。
         """
-        logger.info(
-            f"工具 'get_trade_dates' 已为范围 {start_date or '默认'} 到 {end_date or '默认'} 调用")
+        range_start, range_end = start_date or "default", end_date or "default"
+        logger.info("工具 'get_trade_dates' 已为范围 %s 到 %s 调用", range_start, range_end)
         try:
             df = active_data_source.get_trade_dates(
                 start_date=start_date, end_date=end_date)
             logger.info("已成功检索交易日期。")
-            meta = {"start_date": start_date or "default", "end_date": end_date or "default"}
+            meta = {"start_date": range_start, "end_date": range_end}
             return format_table_output(df, format=format, max_rows=limit, meta=meta)
 
         except NoDataFoundError as e:
-            logger.warning(f"未找到数据错误: {e}")
+            logger.warning("未找到数据错误: %s", e)
             return f"错误: {e}"
         except LoginError as e:
-            logger.error(f"登录错误: {e}")
+            logger.error("登录错误: %s", e)
             return f"错误: 无法连接到数据源。{e}"
         except DataSourceError as e:
-            logger.error(f"数据源错误: {e}")
+            logger.error("数据源错误: %s", e)
             return f"错误: 获取数据时发生错误。{e}"
         except ValueError as e:
-            logger.warning(f"值错误: {e}")
+            logger.warning("值错误: %s", e)
             return f"错误: 无效的输入参数。{e}"
         except Exception as e:
             logger.exception(
-                f"处理 get_trade_dates 时发生意外异常: {e}")
+                "处理 get_trade_dates 时发生意外异常: %s", e)
             return f"错误: 发生意外错误: {e}"
 
     @app.tool()
@@ -74,30 +158,29 @@ def register_market_overview_tools(app: FastMCP, active_data_source: FinancialDa
         Returns:
             str: 列出股票代码和交易状态 (1=交易, 0=停牌) 的 Markdown 表格。
         """
-        logger.info(
-            f"工具 'get_all_stock' 已为日期={date or '默认'} 调用")
+        as_of = date or "default"
+        logger.info("工具 'get_all_stock' 已为日期=%s 调用", as_of)
         try:
             df = active_data_source.get_all_stock(date=date)
-            logger.info(
-                f"已成功检索日期为 {date or '默认'} 的股票列表。")
-            meta = {"as_of": date or "default"}
+            logger.info("已成功检索日期为 %s 的股票列表。", as_of)
+            meta = {"as_of": as_of}
             return format_table_output(df, format=format, max_rows=limit, meta=meta)
 
         except NoDataFoundError as e:
-            logger.warning(f"未找到数据错误: {e}")
+            logger.warning("未找到数据错误: %s", e)
             return f"错误: {e}"
         except LoginError as e:
-            logger.error(f"登录错误: {e}")
+            logger.error("登录错误: %s", e)
             return f"错误: 无法连接到数据源。{e}"
         except DataSourceError as e:
-            logger.error(f"数据源错误: {e}")
+            logger.error("数据源错误: %s", e)
             return f"错误: 获取数据时发生错误。{e}"
         except ValueError as e:
-            logger.warning(f"值错误: {e}")
+            logger.warning("值错误: %s", e)
             return f"错误: 无效的输入参数。{e}"
         except Exception as e:
             logger.exception(
-                f"处理 get_all_stock 时发生意外异常: {e}")
+                "处理 get_all_stock 时发生意外异常: %s", e)
             return f"错误: 发生意外错误: {e}"
 
     @app.tool()
@@ -114,20 +197,23 @@ def register_market_overview_tools(app: FastMCP, active_data_source: FinancialDa
         Returns:
             str: 匹配的股票代码及其交易状态。
         """
-        logger.info("工具 'search_stocks' 已调用 keyword=%s, date=%s, limit=%s, format=%s", keyword, date or "默认", limit, format)
+        as_of = date or "current"
+        logger.info("工具 'search_stocks' 已调用 keyword=%s, date=%s, limit=%s, format=%s", keyword, as_of, limit, format)
         try:
             if not keyword or not keyword.strip():
                 return "错误: 'keyword' 是必需的 (代码的子串)。"
-            df = active_data_source.get_all_stock(date=date)
-            if df is None or df.empty:
+            index = get_stock_index(date)
+            if index is None:
                 return "(无可用数据显示)"
             kw = keyword.strip().lower()
-            filtered = df[df["code"].str.lower().str.contains(kw, na=False)]
-            meta = {"keyword": keyword, "as_of": date or "current"}
-            return format_table_output(filtered, format=format, max_rows=limit, meta=meta)
+            # 按字面子串匹配（关键字中的 '.' 等字符不作为正则解释）；只取出要返回的前 limit 行
+            positions = index.find(kw)
+            filtered = index.df.iloc[positions[:limit]]
+            meta = {"keyword": keyword, "as_of": as_of}
+            return format_table_output(
+                filtered, format=format, max_rows=limit, meta=meta, total_rows=int(positions.size))
         except Exception as e:
-            logger.exception("处理 search_stocks 时发生异常: %s", e)
-            return f"错误: 发生意外错误: {e}"
+            return tool_error_response("search_stocks", e)
 
     @app.tool()
     def get_suspensions(date: Optional[str] = None, limit: int = 250, format: str = "markdown") -> str:
@@ -142,16 +228,19 @@ def register_market_overview_tools(app: FastMCP, active_data_source: FinancialDa
         Returns:
             str: tradeStatus==0 的股票表格。
         """
-        logger.info("工具 'get_suspensions' 已调用 date=%s, limit=%s, format=%s", date or "current", limit, format)
+        as_of = date or "current"
+        logger.info("工具 'get_suspensions' 已调用 date=%s, limit=%s, format=%s", as_of, limit, format)
         try:
-            df = active_data_source.get_all_stock(date=date)
-            if df is None or df.empty:
+            index = get_stock_index(date)
+            if index is None:
                 return "(无可用数据显示)"
-            if "tradeStatus" not in df.columns:
+            if "tradeStatus" not in index.df.columns:
                 return "错误: 数据源响应中不存在 'tradeStatus' 列。"
-            suspended = df[df["tradeStatus"] == '0']
-            meta = {"as_of": date or "current", "total_suspended": int(suspended.shape[0])}
-            return format_table_output(suspended, format=format, max_rows=limit, meta=meta)
+            # 在分类编码上筛选并计数，只取出要返回的前 limit 行，不复制全部停牌行
+            positions = index.status_positions('0')
+            total = int(positions.size)
+            suspended = index.df.take(positions[:limit])
+            meta = {"as_of": as_of, "total_suspended": total}
+            return format_table_output(suspended, format=format, max_rows=limit, meta=meta, total_rows=total)
         except Exception as e:
-            logger.exception("处理 get_suspensions 时发生异常: %s", e)
-            return f"错误: 发生意外错误: {e}"
+            return tool_error_response("get_suspensions", e)
@@ -8,9 +8,37 @@ from typing import List, Optional
 from mcp.server.fastmcp import FastMCP
 from src.data_source_interface import FinancialDataSource, NoDataFoundError, LoginError, DataSourceError
 from src.formatting.markdown_formatter import format_df_to_markdown, format_table_output
+from src.tools.base import is_valid_year
 
 logger = logging.getLogger(__name__)
 
+# get_historical_k_data 的有效参数值（来自 Baostock），按文档顺序排列以便生成错误消息
+_FREQUENCY_OPTIONS = ['d', 'w', 'm', '5', '15', '30', '60']
+_ADJUST_FLAG_OPTIONS = ['1', '2', '3']
+_VALID_FREQS = frozenset(_FREQUENCY_OPTIONS)
+_VALID_ADJUSTS = frozenset(_ADJUST_FLAG_OPTIONS)
+# get_dividend_data 的有效年份类型
+_VALID_YEAR_TYPES = frozenset(('report', 'operate'))
+# 错误消息模板，只在参数无效时才填入具体的值
+_INVALID_FREQ_MSG = f"错误: 无效的频率 '%s'。有效选项为: {_FREQUENCY_OPTIONS}"
+_INVALID_ADJUST_MSG = f"错误: 无效的复权标志 '%s'。有效选项为: {_ADJUST_FLAG_OPTIONS}"
+
+# get_historical_k_data 的参数校验表: (参数名, 日志中的名称, 有效值集合, 错误消息模板)，按顺序检查
+_KDATA_VALIDATORS = (
+    ("frequency", "频率", _VALID_FREQS, _INVALID_FREQ_MSG),
+    ("adjust_flag", "复权标志", _VALID_ADJUSTS, _INVALID_ADJUST_MSG),
+)
+
+
+def _validate_k_params(**params: str) -> Optional[str]:
+    """按 _KDATA_VALIDATORS 校验 K 线参数，返回第一个无效参数的错误消息，全部有效时返回 None。"""
+    for name, label, allowed, template in _KDATA_VALIDATORS:
+        value = params[name]
+        if value not in allowed:
+            logger.warning("请求了无效的%s: %s", label, value)
+            return template % value
+    return None
+
 
 def register_stock_market_tools(app: FastMCP, active_data_source: FinancialDataSource):
     """
@@ -63,16 +91,12 @@ def register_stock_market_tools(app: FastMCP, active_data_source: FinancialDataS
                  如果结果集太大，表格可能会被截断。
         """
         logger.info(
-            f"工具 'get_historical_k_data' 已为 {code} 调用 ({start_date}-{end_date}, 频率={frequency}, 复权={adjust_flag}, 字段={fields})")
+            "工具 'get_historical_k_data' 已为 %s 调用 (%s-%s, 频率=%s, 复权=%s, 字段=%s)",
+            code, start_date, end_date, frequency, adjust_flag, fields)
         try:
-            valid_freqs = ['d', 'w', 'm', '5', '15', '30', '60']
-            valid_adjusts = ['1', '2', '3']
-            if frequency not in valid_freqs:
-                logger.warning(f"请求了无效的频率: {frequency}")
-                return f"错误: 无效的频率 '{frequency}'。有效选项为: {valid_freqs}"
-            if adjust_flag not in valid_adjusts:
-                logger.warning(f"请求了无效的复权标志: {adjust_flag}")
-                return f"错误: 无效的复权标志 '{adjust_flag}'。有效选项为: {valid_adjusts}"
+            error = _validate_k_params(frequency=frequency, adjust_flag=adjust_flag)
+            if error:
+                return error
 
             df = active_data_source.get_historical_k_data(
                 code=code,
@@ -83,25 +107,25 @@ def register_stock_market_tools(app: FastMCP, active_data_source: FinancialDataS
                 fields=fields,
             )
             logger.info(
-                f"已成功检索 {code} 的K线数据，正在格式化输出。")
+                "已成功检索 %s 的K线数据，正在格式化输出。", code)
             meta = {"code": code, "start_date": start_date, "end_date": end_date, "frequency": frequency, "adjust_flag": adjust_flag}
             return format_table_output(df, format=format, max_rows=limit, meta=meta)
 
         except NoDataFoundError as e:
-            logger.warning(f"未找到数据错误 for {code}: {e}")
+            logger.warning("未找到数据错误 for %s: %s", code, e)
             return f"错误: {e}"
         except LoginError as e:
-            logger.error(f"登录错误 for {code}: {e}")
+            logger.error("登录错误 for %s: %s", code, e)
             return f"错误: 无法连接到数据源。{e}"
         except DataSourceError as e:
-            logger.error(f"数据源错误 for {code}: {e}")
+            logger.error("数据源错误 for %s: %s", code, e)
             return f"错误: 获取数据时发生错误。{e}"
         except ValueError as e:
-            logger.warning(f"值错误处理请求 for {code}: {e}")
+            logger.warning("值错误处理请求 for %s: %s", code, e)
             return f"错误: 无效的输入参数。{e}"
         except Exception as e:
             logger.exception(
-                f"处理 get_historical_k_data for {code} 时发生意外异常: {e}")
+                "处理 get_historical_k_data for %s 时发生意外异常: %s", code, e)
             return f"错误: 发生意外错误: {e}"
 
     @app.tool()
@@ -120,31 +144,31 @@ def register_stock_market_tools(app: FastMCP, active_data_source: FinancialDataS
             str: 请求格式的股票基本信息。
         """
         logger.info(
-            f"工具 'get_stock_basic_info' 已为 {code} 调用 (字段={fields})")
+            "工具 'get_stock_basic_info' 已为 %s 调用 (字段=%s)", code, fields)
         try:
             df = active_data_source.get_stock_basic_info(
                 code=code, fields=fields)
 
             logger.info(
-                f"已成功检索 {code} 的基本信息，正在格式化输出。")
+                "已成功检索 %s 的基本信息，正在格式化输出。", code)
             meta = {"code": code}
             return format_table_output(df, format=format, max_rows=df.shape[0] if df is not None else 0, meta=meta)
 
         except NoDataFoundError as e:
-            logger.warning(f"未找到数据错误 for {code}: {e}")
+            logger.warning("未找到数据错误 for %s: %s", code, e)
             return f"错误: {e}"
         except LoginError as e:
-            logger.error(f"登录错误 for {code}: {e}")
+            logger.error("登录错误 for %s: %s", code, e)
             return f"错误: 无法连接到数据源。{e}"
         except DataSourceError as e:
-            logger.error(f"数据源错误 for {code}: {e}")
+            logger.error("数据源错误 for %s: %s", code, e)
             return f"错误: 获取数据时发生错误。{e}"
         except ValueError as e:
-            logger.warning(f"值错误处理请求 for {code}: {e}")
+            logger.warning("值错误处理请求 for %s: %s", code, e)
             return f"错误: 无效的输入参数或请求的字段不可用。{e}"
         except Exception as e:
             logger.exception(
-                f"处理 get_stock_basic_info for {code} 时发生意外异常: {e}")
+                "处理 get_stock_basic_info for %s 时发生意外异常: %s", code, e)
             return f"错误: 发生意外错误: {e}"
 
     @app.tool()
@@ -166,37 +190,37 @@ def register_stock_market_tools(app: FastMCP, active_data_source: FinancialDataS
             str: 股息记录表。
         """
         logger.info(
-            f"工具 'get_dividend_data' 已为 {code} 调用，年份={year}，年份类型={year_type}")
+            "工具 'get_dividend_data' 已为 %s 调用，年份=%s，年份类型=%s", code, year, year_type)
         try:
-            if year_type not in ['report', 'operate']:
-                logger.warning(f"请求了无效的年份类型: {year_type}")
+            if year_type not in _VALID_YEAR_TYPES:
+                logger.warning("请求了无效的年份类型: %s", year_type)
                 return f"错误: 无效的年份类型 '{year_type}'。有效选项为: 'report', 'operate'"
-            if not year.isdigit() or len(year) != 4:
-                logger.warning(f"请求了无效的年份格式: {year}")
+            if not is_valid_year(year):
+                logger.warning("请求了无效的年份格式: %s", year)
                 return f"错误: 无效的年份 '{year}'。请输入4位数字的年份。"
 
             df = active_data_source.get_dividend_data(
                 code=code, year=year, year_type=year_type)
             logger.info(
-                f"已成功检索 {code} 在 {year} 年的股息数据。")
+                "已成功检索 %s 在 %s 年的股息数据。", code, year)
             meta = {"code": code, "year": year, "year_type": year_type}
             return format_table_output(df, format=format, max_rows=limit, meta=meta)
 
         except NoDataFoundError as e:
-            logger.warning(f"未找到数据错误 for {code}, year {year}: {e}")
+            logger.warning("未找到数据错误 for %s, year %s: %s", code, year, e)
             return f"错误: {e}"
         except LoginError as e:
-            logger.error(f"登录错误 for {code}: {e}")
+            logger.error("登录错误 for %s: %s", code, e)
             return f"错误: 无法连接到数据源。{e}"
         except DataSourceError as e:
-            logger.error(f"数据源错误 for {code}: {e}")
+            logger.error("数据源错误 for %s: %s", code, e)
             return f"错误: 获取数据时发生错误。{e}"
         except ValueError as e:
-            logger.warning(f"值错误处理请求 for {code}: {e}")
+            logger.warning("值错误处理请求 for %s: %s", code, e)
             return f"错误: 无效的输入参数。{e}"
         except Exception as e:
             logger.exception(
-                f"处理 get_dividend_data for {code} 时发生意外异常: {e}")
+                "处理 get_dividend_data for %s 时发生意外异常: %s", code, e)
             return f"错误: 发生意外错误: {e}"
 
     @app.tool()
@@ -216,28 +240,28 @@ def register_stock_market_tools(app: FastMCP, active_data_source: FinancialDataS
             str: 复权因子表。
         """
         logger.info(
-            f"工具 'get_adjust_factor_data' 已为 {code} 调用 ({start_date} 到 {end_date})")
+            "工具 'get_adjust_factor_data' 已为 %s 调用 (%s 到 %s)", code, start_date, end_date)
         try:
             df = active_data_source.get_adjust_factor_data(
                 code=code, start_date=start_date, end_date=end_date)
             logger.info(
-                f"已成功检索 {code} 的复权因子数据。")
+                "已成功检索 %s 的复权因子数据。", code)
             meta = {"code": code, "start_date": start_date, "end_date": end_date}
             return format_table_output(df, format=format, max_rows=limit, meta=meta)
 
         except NoDataFoundError as e:
-            logger.warning(f"未找到数据错误 for {code}: {e}")
+            logger.warning("未找到数据错误 for %s: %s", code, e)
             return f"错误: {e}"
         except LoginError as e:
-            logger.error(f"登录错误 for {code}: {e}")
+            logger.error("登录错误 for %s: %s", code, e)
             return f"错误: 无法连接到数据源。{e}"
         except DataSourceError as e:
-            logger.error(f"数据源错误 for {code}: {e}")
+            logger.error("数据源错误 for %s: %s", code, e)
             return f"错误: 获取数据时发生错误。{e}"
         except ValueError as e:
-            logger.warning(f"值错误处理请求 for {code}: {e}")
+            logger.warning("值错误处理请求 for %s: %s", code, e)
             return f"错误: 无效的输入参数。{e}"
         except Exception as e:
             logger.exception(
-                f"处理 get_adjust_factor_data for {code} 时发生意外异常: {e}")
+                "处理 get_adjust_factor_data for %s 时发生意外异常: %s", code, e)
             return f"错误: 发生意外错误: {e}"
@@ -1,82 +1,325 @@
 # 工具函数，包括 Baostock 登录上下文管理器和日志设置
-import baostock as bs
+import atexit
 import os
+import queue
 import sys
 import logging
-from contextlib import contextmanager
-from .data_source_interface import LoginError
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from .data_source_interface import DataSourceError, LoginError
 
 # --- 日志设置 ---
+# 日志队列容量；队列满时丢弃最旧的记录而不是阻塞调用方
+LOG_QUEUE_MAXLEN = 4096
+
+_log_listener: Optional[QueueListener] = None
+
+
+class _RingBufferQueue:
+    """
+    供 QueueHandler/QueueListener 使用的有界环形队列。
+
+    put_nowait 永不阻塞: 队列已满时 deque 自动淘汰最旧的记录，
+    因此日志突发不会拖慢工具调用。
+    """
+
+    def __init__(self, maxlen: int):
+        self._items = deque(maxlen=maxlen)
+        self._not_empty = threading.Condition(threading.Lock())
+
+    def put_nowait(self, item) -> None:
+        with self._not_empty:
+            self._items.append(item)
+            self._not_empty.notify()
+
+    def get(self, block: bool = True):
+        with self._not_empty:
+            if not block and not self._items:
+                raise queue.Empty
+            while not self._items:
+                self._not_empty.wait()
+            return self._items.popleft()
+
+    def empty(self) -> bool:
+        return not self._items
+
+
+class _BatchingStreamHandler(logging.StreamHandler):
+    """
+    供 QueueListener 使用、在日志突发时合并写出的 StreamHandler。
+
+    记录编码后写入流底层的二进制缓冲区而不逐条 flush（stderr 默认按行 flush，
+    每条记录都是一次 write 系统调用），只在队列中没有待写记录时 flush:
+    突发的多条日志合并为一次 write，空闲时单条日志仍立即写出。
+    流没有二进制缓冲区（例如被替换为 StringIO）时按普通 StreamHandler 处理。
+    """
+
+    def __init__(self, stream, pending: _RingBufferQueue):
+        super().__init__(stream)
+        self._pending = pending
+        self._buffer = getattr(stream, "buffer", None)
+        self._encoding = getattr(stream, "encoding", None) or "utf-8"
+
+    def emit(self, record):
+        if self._buffer is None:
+            super().emit(record)
+            return
+        try:
+            msg = self.format(record) + self.terminator
+            self._buffer.write(msg.encode(self._encoding, "backslashreplace"))
+            if self._pending.empty():
+                self._buffer.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._buffer is not None:
+                self._buffer.flush()
+        finally:
+            self.release()
+        super().flush()
+
+
+class _SecondCachedFormatter(logging.Formatter):
+    """
+    同一秒内的记录复用已格式化的时间字符串，不再逐条调用 localtime/strftime。
+
+    仅适用于精确到秒的 datefmt；只在 QueueListener 的单个线程中使用。
+    """
+
+    def __init__(self, fmt: str, datefmt: str):
+        super().__init__(fmt=fmt, datefmt=datefmt)
+        self._cached_time = (None, "")
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        cached_second, text = self._cached_time
+        if second != cached_second:
+            text = super().formatTime(record, datefmt)
+            self._cached_time = (second, text)
+        return text
+
+
 def setup_logging(level=logging.INFO):
     """
     为应用程序配置基本日志。
 
+    日志显式写入 stderr: 在 stdio 传输下 stdout 只能承载 JSON-RPC 消息，
+    任何写入 stdout 的日志都会破坏协议帧。
+    记录先进入有界队列，由后台 QueueListener 线程写出，工具调用线程不做阻塞 I/O；
+    队列中积压的多条记录合并为一次写出。
+    日志格式不使用线程和进程信息，因此关闭这些字段的采集，减少创建每条记录的开销。
+
     Args:
         level (int, optional): 日志级别。默认为 logging.INFO。
     """
-    logging.basicConfig(
-        level=level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    global _log_listener
+    if _log_listener is not None:
+        return
+
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    log_queue = _RingBufferQueue(maxlen=LOG_QUEUE_MAXLEN)
+    stream_handler = _BatchingStreamHandler(sys.stderr, log_queue)
+    stream_handler.setFormatter(_SecondCachedFormatter(
+        fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    ))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(QueueHandler(log_queue))
+
+    _log_listener = QueueListener(log_queue, stream_handler)
+    _log_listener.start()
+    # 进程退出时写出队列中剩余的记录
+    atexit.register(_log_listener.stop)
     # 如果依赖项的日志过于冗长，可以选择性地静默它们
     # logging.getLogger("mcp").setLevel(logging.WARNING)
 
 # 获取此模块的 logger 实例 (可选，但是个好习惯)
 logger = logging.getLogger(__name__)
 
-# --- Baostock 上下文管理器 ---
-@contextmanager
-def baostock_login_context():
-    """
-    处理 Baostock 登录和登出的上下文管理器，同时抑制 stdout 消息。
+# --- Baostock 会话锁 ---
+# Baostock 把唯一的 socket 保存在模块级全局变量中，同一进程内无法建立多个会话，
+# 因此“连接池”的容量只能是 1: 任一时刻只允许一个调用持有会话，其余调用排队等待，
+# 避免并发的工具调用在共享 socket 上交错读写。
+_session_lock = threading.Lock()
 
-    Yields:
-        None
+# 等待会话锁超过该秒数时记录警告
+SESSION_WAIT_WARN_SECONDS = 1.0
 
-    Raises:
-        LoginError: 如果 Baostock 登录失败。
-    """
-    # 重定向 stdout 以抑制登录/登出消息
-    original_stdout_fd = sys.stdout.fileno()
-    saved_stdout_fd = os.dup(original_stdout_fd)
-    devnull_fd = os.open(os.devnull, os.O_WRONLY)
+# Baostock 通过 print() 输出提示和错误消息，调用 Baostock 期间把 sys.stdout 指向这里。
+# 只替换 Python 层的 sys.stdout，不改动文件描述符 1: stdio 传输持有的 stdout 不受影响。
+_DEVNULL = open(os.devnull, "w")
+# 退出处理按注册的逆序执行: 之后注册的登出（见 mcp_server）先于此处的关闭运行
+atexit.register(_DEVNULL.close)
 
-    os.dup2(devnull_fd, original_stdout_fd)
-    os.close(devnull_fd)
 
-    logger.debug("尝试 Baostock 登录...")
-    lg = bs.login()
-    logger.debug(f"登录结果: code={lg.error_code}, msg={lg.error_msg}")
+def _suppress_stdout() -> redirect_stdout:
+    """返回丢弃 Baostock print() 输出的上下文管理器，退出时（包括异常时）恢复 sys.stdout。"""
+    return redirect_stdout(_DEVNULL)
 
-    # 恢复 stdout
-    os.dup2(saved_stdout_fd, original_stdout_fd)
-    os.close(saved_stdout_fd)
+# 会话在多次查询间保持登录，仅在首次使用、会话失效、长时间空闲或显式登出后重新登录。
+# 与 socket 一样，登录状态是进程级的，因此放在模块级而不是数据源实例上。
+_session_active = False
+
+# 会话空闲超过该秒数后，下次使用前主动重新登录。服务端可能已关闭空闲连接，
+# 直接查询要等到网络错误（甚至接收超时）后才会重试，不如先刷新会话。
+SESSION_IDLE_RELOGIN_SECONDS = 600
+
+# 上次使用会话的时刻 (time.monotonic())，调用方须持有 _session_lock
+_session_last_used = 0.0
+
+# 每个线程嵌套进入 baostock_login_context 的层数，只有最外层获取会话锁和重定向 stdout
+_session_local = threading.local()
+
+# 表示会话已失效（未登录或网络断开）的 Baostock 错误码，遇到时重新登录并重试一次
+STALE_SESSION_ERROR_CODES = frozenset({
+    "10001001",  # 用户未登录
+    "10002001", "10002002", "10002003", "10002004",  # 网络错误/连接失败/连接超时/接收时连接断开
+    "10002005", "10002006", "10002007", "10002008",  # 发送失败/发送超时/接收错误/接收超时
+})
+
+
+def _login():
+    """登录 Baostock 并抑制其 stdout 输出。调用方须持有 _session_lock。"""
+    global _session_active
+    import baostock as bs
+
+    logger.debug("尝试 Baostock 登录...")
+    with _suppress_stdout():
+        lg = bs.login()
+    logger.debug("登录结果: code=%s, msg=%s", lg.error_code, lg.error_msg)
 
     if lg.error_code != '0':
         # 在引发异常前记录错误
-        logger.error(f"Baostock 登录失败: {lg.error_msg}")
+        logger.error("Baostock 登录失败: %s", lg.error_msg)
         raise LoginError(f"Baostock 登录失败: {lg.error_msg}")
 
+    _session_active = True
     logger.info("Baostock 登录成功。")
+
+
+def _logout():
+    """登出 Baostock 并抑制其 stdout 输出。调用方须持有 _session_lock。"""
+    global _session_active
+    import baostock as bs
+
+    if not _session_active:
+        return
+    _session_active = False
+
+    logger.debug("尝试 Baostock 登出...")
+    with _suppress_stdout():
+        bs.logout()
+    logger.debug("登出完成。")
+    logger.info("Baostock 登出成功。")
+
+
+def baostock_logout():
+    """结束持久会话。之后的查询会重新登录。"""
+    with _session_lock:
+        _logout()
+
+
+def _acquire_session() -> None:
+    """
+    获取会话锁；因其他线程占用而等待过久时记录警告。
+
+    Baostock 无法为每个线程建立独立连接，并发查询只能在这把锁上排队，
+    警告用于提示调用方并发不会带来 Baostock 查询的加速。
+    """
+    if _session_lock.acquire(blocking=False):
+        return
+    start = time.monotonic()
+    _session_lock.acquire()
+    waited = time.monotonic() - start
+    if waited >= SESSION_WAIT_WARN_SECONDS:
+        logger.warning(
+            "等待 Baostock 会话 %.1f 秒: Baostock 每个进程只有一个会话，并发查询会依次排队执行。", waited)
+
+
+# --- Baostock 上下文管理器 ---
+@contextmanager
+def baostock_login_context():
+    """
+    获取 Baostock 会话的上下文管理器，同时抑制 stdout 消息。
+
+    会话在首次使用时登录，之后在多次调用间复用，不再每次登录/登出；
+    已登录时进入上下文不产生任何网络往返。空闲超过 SESSION_IDLE_RELOGIN_SECONDS
+    的会话在使用前重新登录。
+    在整个上下文期间持有进程级会话锁，保证查询与结果遍历不会被其他线程打断。
+    可以嵌套使用: 同一线程内的内层上下文直接复用外层的会话锁和 stdout 重定向，
+    因此需要连续调用多个 Baostock 接口时，可以在外层用一个上下文包住全部调用。
+
+    Yields:
+        None
+
+    Raises:
+        LoginError: 如果 Baostock 登录失败。
+    """
+    global _session_active, _session_last_used
+    depth = getattr(_session_local, "depth", 0)
+    outermost = depth == 0
+    if outermost:
+        _acquire_session()
+    _session_local.depth = depth + 1
     try:
-        yield  # API 调用在此处发生
+        # 查询和结果翻页出错时 Baostock 也会 print() 错误消息，整个会话期间都丢弃；
+        # 嵌套的上下文已处于外层的重定向之内
+        with _suppress_stdout() if outermost else nullcontext():
+            if not _session_active:
+                _login()
+            elif outermost and time.monotonic() - _session_last_used >= SESSION_IDLE_RELOGIN_SECONDS:
+                logger.info("Baostock 会话已空闲超过 %d 秒，重新登录。", SESSION_IDLE_RELOGIN_SECONDS)
+                _login()
+            try:
+                yield  # API 调用在此处发生
+            except (DataSourceError, ValueError):
+                # 数据源错误和参数错误（如请求的字段不存在）不影响会话状态
+                raise
+            except Exception:
+                # 非预期异常（如 socket 错误）后无法确认会话状态，下次使用时重新登录
+                _session_active = False
+                raise
     finally:
-        # 再次为登出重定向 stdout
-        original_stdout_fd = sys.stdout.fileno()
-        saved_stdout_fd = os.dup(original_stdout_fd)
-        devnull_fd = os.open(os.devnull, os.O_WRONLY)
+        _session_local.depth = depth
+        if outermost:
+            _session_last_used = time.monotonic()
+            _session_lock.release()
 
-        os.dup2(devnull_fd, original_stdout_fd)
-        os.close(devnull_fd)
 
-        logger.debug("尝试 Baostock 登出...")
-        bs.logout()
-        logger.debug("登出完成。")
+def query_with_relogin(bs_query_func, *args, **kwargs):
+    """
+    在 baostock_login_context 内执行一次 Baostock 查询，会话失效时重新登录并重试一次。
 
-        # 恢复 stdout
-        os.dup2(saved_stdout_fd, original_stdout_fd)
-        os.close(saved_stdout_fd)
-        logger.info("Baostock 登出成功。")
+    Args:
+        bs_query_func (function): Baostock 查询函数 (例如, bs.query_history_k_data_plus)。
+        *args, **kwargs: 传递给查询函数的参数。
+
+    Returns:
+        Baostock 查询返回的 ResultData。
+
+    Raises:
+        LoginError: 如果重新登录失败。
+    """
+    rs = bs_query_func(*args, **kwargs)
+    if rs.error_code in STALE_SESSION_ERROR_CODES:
+        logger.warning(
+            "Baostock 会话已失效 (%s, 错误码: %s)，重新登录后重试。", rs.error_msg, rs.error_code)
+        _login()
+        rs = bs_query_func(*args, **kwargs)
+    return rs
 
 # 如果需要，你可以在此处添加其他工具函数或类
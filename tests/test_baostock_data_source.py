@@ -0,0 +1,71 @@
+import threading
+
+import baostock as bs
+import pytest
+
+from src import utils
+from src.baostock_data_source import BaostockDataSource
+
+
+class _PagedResult:
+    """模拟 Baostock ResultData: 每页 2 行，翻页时才“请求”下一页。"""
+
+    error_code = "0"
+    error_msg = "success"
+    fields = ["date", "code", "close"]
+
+    def __init__(self, pages):
+        self._pages = list(pages)
+        self.data = self._pages.pop(0)
+        self.cur_row_num = 0
+        self.page_requests = []
+
+    def next(self):
+        if self.cur_row_num < len(self.data):
+            return True
+        if not self._pages:
+            return False
+        # 翻页在会话锁内进行
+        self.page_requests.append(utils._session_lock.locked())
+        self.data = self._pages.pop(0)
+        self.cur_row_num = 0
+        return True
+
+
+class _LoginResult:
+    error_code = "0"
+    error_msg = "success"
+
+
+@pytest.fixture
+def paged_result(monkeypatch):
+    rs = _PagedResult([
+        [["2024-01-02", "sh.600000", "7.1"], ["2024-01-03", "sh.600000", "7.2"]],
+        [["2024-01-04", "sh.600000", "7.3"], ["2024-01-05", "sh.600000", "7.4"]],
+        [["2024-01-08", "sh.600000", "7.5"]],
+    ])
+    monkeypatch.setattr(bs, "login", lambda: _LoginResult())
+    monkeypatch.setattr(bs, "query_history_k_data_plus", lambda *args, **kwargs: rs)
+    monkeypatch.setattr(utils, "_session_active", False)
+    return rs
+
+
+def test_chunked_k_data_does_not_hold_session_between_chunks(paged_result):
+    chunks = BaostockDataSource().get_historical_k_data(
+        "sh.600000", "2024-01-01", "2024-01-31", fields=["date", "code", "close"], chunksize=2)
+
+    first = next(chunks)
+    # 暂停的迭代器既不占住会话锁，也不在当前线程留下嵌套层数
+    assert not utils._session_lock.locked()
+    assert getattr(utils._session_local, "depth", 0) == 0
+
+    # 在其他线程上读完剩余分块
+    rest = []
+    worker = threading.Thread(target=lambda: rest.extend(chunks))
+    worker.start()
+    worker.join()
+
+    assert [len(c) for c in [first, *rest]] == [2, 2, 1]
+    assert rest[-1]["close"].tolist() == [7.5]
+    assert paged_result.page_requests == [True, True]
+    assert getattr(utils._session_local, "depth", 0) == 0
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+from src.caching_data_source import DailyMemo
+
+
+def test_daily_memo_expires_at_refresh_time():
+    memo = DailyMemo()
+    morning = datetime(2024, 1, 2, 9, 0)
+    memo.put("2024-01-02", "groups", morning)
+
+    assert memo.get("2024-01-02", morning + timedelta(hours=8)) == "groups"
+    assert memo.get("2024-01-02", morning.replace(hour=18)) is None
+
+
+def test_daily_memo_is_bounded():
+    memo = DailyMemo(maxsize=2)
+    now = datetime(2024, 1, 2, 9, 0)
+    for date in ("2024-01-01", "2023-12-29", "2023-12-28"):
+        memo.put(date, date, now)
+
+    assert memo.get("2024-01-01", now) is None
+    assert memo.get("2023-12-28", now) == "2023-12-28"
+    assert len(memo._items) == 2
+
+
+def test_daily_memo_purges_expired_entries_on_put():
+    memo = DailyMemo(maxsize=8)
+    yesterday = datetime(2024, 1, 1, 9, 0)
+    memo.put("2023-12-29", "old", yesterday)
+
+    memo.put("2024-01-02", "new", yesterday + timedelta(days=1))
+
+    assert list(memo._items) == ["2024-01-02"]
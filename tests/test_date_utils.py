@@ -0,0 +1,45 @@
+import asyncio
+
+import pandas as pd
+import pytest
+from mcp.server.fastmcp import FastMCP
+
+from src.data_source_interface import NoDataFoundError
+from src.tools.date_utils import bulk_classify_trading_days, register_date_utils_tools
+
+
+class _CalendarSource:
+    """只发布了 2025 年交易日历的假数据源。"""
+
+    def get_trade_dates(self, start_date=None, end_date=None):
+        if not start_date.startswith("2025"):
+            raise NoDataFoundError(f"没有 {start_date} 至 {end_date} 的交易日历")
+        days = pd.date_range("2025-01-01", "2025-12-31")
+        return pd.DataFrame({
+            "calendar_date": days.strftime("%Y-%m-%d"),
+            "is_trading_day": ["1" if d.weekday() < 5 else "0" for d in days],
+        })
+
+
+@pytest.fixture
+def call_tool():
+    app = FastMCP()
+    register_date_utils_tools(app, _CalendarSource())
+    return lambda name, **args: asyncio.run(app.call_tool(name, args))[0].text
+
+
+def test_next_trading_day_skips_unpublished_next_year(call_tool):
+    # 年末往后 30 天跨入尚未发布日历的 2026 年
+    assert call_tool("next_trading_day", date="2025-12-29") == "2025-12-30"
+    assert call_tool("next_trading_day", date="2025-12-31") == "2025-12-31"
+
+
+def test_is_trading_day_far_future_is_not_trading_day(call_tool):
+    assert call_tool("is_trading_day", date="2030-01-02") == "否"
+    assert call_tool("is_trading_day", date="2025-12-31") == "是"
+
+
+def test_bulk_classify_across_unpublished_year():
+    result = bulk_classify_trading_days(_CalendarSource(), ["2025-12-31", "2026-01-05"])
+
+    assert result == {"2025-12-31": True, "2026-01-05": False}
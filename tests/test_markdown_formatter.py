@@ -0,0 +1,61 @@
+import base64
+import json
+
+import pandas as pd
+import pytest
+
+from src.baostock_data_source import K_FIELD_DTYPES, _apply_dtypes
+from src.formatting import markdown_formatter
+from src.formatting.markdown_formatter import format_table_output
+
+
+@pytest.fixture
+def k_data_with_blanks():
+    # 亏损股的 peTTM、停牌日的 volume 在 Baostock 中都是空字符串
+    rows = [
+        ["2024-01-02", "sh.600000", "7.10", "", "12.5"],
+        ["2024-01-03", "sh.600000", "7.20", "1000", ""],
+    ]
+    df = pd.DataFrame(rows, columns=["date", "code", "close", "volume", "peTTM"])
+    return _apply_dtypes(df, K_FIELD_DTYPES)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_blank_numeric_fields_are_null(k_data_with_blanks, monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(markdown_formatter, "orjson", None)
+    elif markdown_formatter.orjson is None:
+        pytest.skip("orjson 未安装")
+
+    text = format_table_output(k_data_with_blanks, format="json")
+
+    # 标准库 json 遇到 NaN 会输出非法的 JSON 字面量，这里按严格模式解析
+    payload = json.loads(text, parse_constant=lambda c: pytest.fail(f"非法 JSON 常量 {c}"))
+    assert payload["data"][0]["volume"] is None
+    assert payload["data"][1]["peTTM"] is None
+    assert payload["data"][0]["peTTM"] == 12.5
+
+
+def test_markdown_blank_numeric_fields_are_empty(k_data_with_blanks):
+    text = format_table_output(k_data_with_blanks, format="markdown")
+
+    assert "nan" not in text.lower()
+    assert "12.5" in text
+
+
+def test_csv_blank_numeric_fields_are_empty(k_data_with_blanks):
+    lines = format_table_output(k_data_with_blanks, format="csv").splitlines()
+
+    assert lines[1] == "2024-01-02,sh.600000,7.1,,12.5"
+    assert lines[2] == "2024-01-03,sh.600000,7.2,1000,"
+
+
+def test_arrow_blank_numeric_fields_are_null(k_data_with_blanks):
+    pa = pytest.importorskip("pyarrow")
+
+    text = format_table_output(k_data_with_blanks, format="arrow")
+    assert text.startswith("arrow:")
+    table = pa.ipc.open_stream(base64.b64decode(text[len("arrow:"):])).read_all()
+
+    assert table.column("volume").to_pylist() == [None, 1000]
+    assert table.column("peTTM").to_pylist() == [12.5, None]
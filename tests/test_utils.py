@@ -0,0 +1,37 @@
+import baostock as bs
+import pytest
+
+from src import utils
+
+
+class _LoginResult:
+    error_code = "0"
+    error_msg = "success"
+
+
+@pytest.fixture
+def fake_login(monkeypatch):
+    logins = []
+    monkeypatch.setattr(bs, "login", lambda: logins.append(1) or _LoginResult())
+    monkeypatch.setattr(utils, "_session_active", False)
+    return logins
+
+
+def test_invalid_argument_keeps_session(fake_login):
+    with pytest.raises(ValueError):
+        with utils.baostock_login_context():
+            raise ValueError("请求的字段均不可用")
+    with utils.baostock_login_context():
+        pass
+
+    assert len(fake_login) == 1
+
+
+def test_socket_error_forces_relogin(fake_login):
+    with pytest.raises(OSError):
+        with utils.baostock_login_context():
+            raise ConnectionResetError("connection reset")
+    with utils.baostock_login_context():
+        pass
+
+    assert len(fake_login) == 2